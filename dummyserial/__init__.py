@@ -14,5 +14,8 @@ Dummy Serial Python Module.
 
 """
 
-from .classes import Serial  # NOQA
-from .exceptions import DSIOError, DSTypeError  # NOQA
+from .classes import (  # NOQA
+    Serial, ByteBuffer, Clock, Delayed, Impairment, Latency, PortRegistry,
+    ResponseTable, RuleTable, SerialStats, StreamMatcher, ThreadSafeSerial,
+    TraceBuffer, TraceRecord, VirtualClock)
+from .exceptions import DSIOError, DSOverflowError, DSTypeError  # NOQA
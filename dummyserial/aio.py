@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial asyncio Transport.
+
+Mirrors the API of `pyserial-asyncio
+<https://github.com/pyserial/pyserial-asyncio>`_, answering writes with the
+response logic of :class:`dummyserial.Serial`. Responses are delivered to
+the protocol with `loop.call_soon()` (or `loop.call_later()` for paced
+responses), so any number of ports can share one event loop without
+threads.
+"""
+
+import asyncio
+
+import dummyserial.classes
+import dummyserial.exceptions
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+# Positional arguments of `serial.Serial()` and `serial.serial_for_url()`.
+_SERIAL_ARGS = (
+    'port', 'baudrate', 'bytesize', 'parity', 'stopbits', 'timeout',
+    'xonxoff', 'rtscts', 'write_timeout', 'dsrdtr', 'inter_byte_timeout')
+
+
+def _serial_kwargs(args, kwargs):
+    """
+    Maps pySerial's positional arguments, and its `url` keyword, to the
+    keyword arguments of :class:`dummyserial.Serial`.
+    """
+    if len(args) > len(_SERIAL_ARGS):
+        raise dummyserial.exceptions.DSTypeError(
+            'Too many positional arguments: {!r}'.format(args))
+    serial_kwargs = dict(zip(_SERIAL_ARGS, args))
+    serial_kwargs.update(kwargs)
+    if 'url' in serial_kwargs:
+        serial_kwargs['port'] = serial_kwargs.pop('url')
+    return serial_kwargs
+
+
+class SerialTransport(asyncio.Transport):
+    """
+    asyncio Transport for a :class:`dummyserial.Serial` port.
+
+    Args:
+        * loop: Event loop.
+        * protocol: Protocol receiving `data_received()` calls.
+        * serial_instance: The :class:`dummyserial.Serial` port.
+    """
+
+    def __init__(self, loop, protocol, serial_instance):
+        super(SerialTransport, self).__init__()
+        self._loop = loop
+        self._protocol = protocol
+        self._serial = serial_instance
+        self._closing = False
+        self._paused = False
+        self._delivery = None
+        self._loop.call_soon(protocol.connection_made, self)
+        self._schedule_delivery()
+
+    def __repr__(self):
+        return '{0}.{1}({2!r})'.format(
+            self.__module__, self.__class__.__name__, self._serial)
+
+    @property
+    def loop(self):
+        """The event loop of this transport."""
+        return self._loop
+
+    @property
+    def serial(self):
+        """The :class:`dummyserial.Serial` port of this transport."""
+        return self._serial
+
+    def get_extra_info(self, name, default=None):
+        if name == 'serial':
+            return self._serial
+        return default
+
+    def get_protocol(self):
+        return self._protocol
+
+    def set_protocol(self, protocol):
+        self._protocol = protocol
+
+    def is_closing(self):
+        return self._closing
+
+    def is_reading(self):
+        return not self._paused and not self._closing
+
+    def pause_reading(self):
+        self._paused = True
+        self._cancel_delivery()
+
+    def resume_reading(self):
+        self._paused = False
+        self._schedule_delivery()
+
+    def write(self, data):
+        if self._closing:
+            return
+        self._serial.write(bytes(data))
+        self._schedule_delivery()
+
+    def writelines(self, list_of_data):
+        self.write(b''.join(list_of_data))
+
+    def can_write_eof(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def get_write_buffer_limits(self):
+        return (0, 0)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        pass
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        self._cancel_delivery()
+        self._serial.close()
+        self._loop.call_soon(self._protocol.connection_lost, None)
+
+    abort = close
+
+    def _cancel_delivery(self):
+        if self._delivery is not None:
+            self._delivery.cancel()
+            self._delivery = None
+
+    def _schedule_delivery(self):
+        """Schedules delivery of waiting data, if not already scheduled."""
+        if self._delivery is None and self.is_reading():
+            self._delivery = self._loop.call_soon(self._deliver)
+
+    def _deliver(self):
+        self._delivery = None
+        if not self.is_reading():
+            return
+
+        data = self._serial.read_all()
+        if data:
+            self._protocol.data_received(data)
+        if not self.is_reading():
+            return
+
+        # Further chunks of lazy responses are delivered on the next
+        # iteration of the loop, so a paused protocol applies backpressure.
+        if self._serial.in_waiting:
+            self._schedule_delivery()
+            return
+
+        # Paced data still held back is delivered once the segment being
+        # transferred has been released.
+        wait = self._serial._held_wait()  # pylint: disable=W0212
+        if wait is not None:
+            self._delivery = self._loop.call_later(wait, self._deliver)
+
+
+async def create_serial_connection(loop, protocol_factory, *args, **kwargs):
+    """
+    Creates a :class:`dummyserial.Serial` port with the given arguments and
+    connects it to a protocol. As with pySerial, the port (or `url`) and
+    its settings may be passed positionally.
+
+    Returns a (transport, protocol) tuple.
+    """
+    serial_instance = dummyserial.classes.Serial(
+        **_serial_kwargs(args, kwargs))
+    protocol = protocol_factory()
+    transport = SerialTransport(loop, protocol, serial_instance)
+    return transport, protocol
+
+
+async def open_serial_connection(loop=None, limit=None, **kwargs):
+    """
+    Creates a :class:`dummyserial.Serial` port with the given arguments and
+    wraps it in asyncio streams.
+
+    Returns a (StreamReader, StreamWriter) tuple.
+    """
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    if limit is None:
+        limit = 2 ** 16
+    reader = asyncio.StreamReader(limit=limit)
+    protocol = asyncio.StreamReaderProtocol(reader)
+    transport, _ = await create_serial_connection(
+        loop, lambda: protocol, **kwargs)
+    writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+    return reader, writer
@@ -0,0 +1,368 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Benchmarks.
+
+Measures the throughput and per-call cost of :class:`dummyserial.Serial`
+reads and writes. Run with::
+
+    python -m dummyserial.bench [--output results.json] [--compare old.json]
+
+Each benchmark reports ops/s and bytes/s (best of --repeat runs). With
+--compare, benchmarks more than --tolerance slower than a previous result
+file are reported and the exit status is 1. --import-time also measures
+the cold import time of dummyserial in a fresh interpreter.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import dummyserial.classes
+import dummyserial.framing
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """
+    Registers func(scale) as a benchmark. func sets up the benchmark and
+    returns a tuple of the callable to time, and the number of operations
+    and of bytes it will process.
+    """
+    BENCHMARKS.append(func)
+    return func
+
+
+def _serial(**kwargs):
+    kwargs.setdefault('port', '/dev/ttyBENCH')
+    kwargs.setdefault('ds_debug', False)
+    kwargs.setdefault('ds_clock', dummyserial.classes.VirtualClock())
+    return dummyserial.classes.Serial(**kwargs)
+
+
+@benchmark
+def read_byte(scale):
+    """read(1) loop over a single large response."""
+    size = int(256 * 1024 * scale)
+    ds_instance = _serial(ds_responses={'dump': b'x' * size})
+    ds_instance.write(b'dump')
+    read = ds_instance.read
+
+    def loop():
+        for _ in range(size):
+            read(1)
+    return loop, size, size
+
+
+@benchmark
+def read_bulk(scale):
+    """read(4096) loop over a single large response."""
+    size = int(64 * 1024 * 1024 * scale)
+    ds_instance = _serial(ds_responses={'dump': b'x' * size})
+    ds_instance.write(b'dump')
+    read = ds_instance.read
+    ops = size // 4096
+
+    def loop():
+        for _ in range(ops):
+            read(4096)
+    return loop, ops, size
+
+
+@benchmark
+def read_impaired(scale):
+    """read(65536) loop over a response impaired at 1e-5 per byte."""
+    size = int(64 * 1024 * 1024 * scale)
+    ds_instance = _serial(
+        ds_responses={'dump': b'x' * size},
+        ds_impairment=dummyserial.classes.Impairment(
+            1e-5, 1e-5, 1e-5, seed=1))
+    ops = size // 65536
+
+    def loop():
+        ds_instance.write(b'dump')
+        for _ in range(ops):
+            ds_instance.read(65536)
+    return loop, ops, size
+
+
+@benchmark
+def write_many_keys(scale):
+    """write() and read() against a 50k key ds_responses dict."""
+    ds_responses = dict(
+        ('READ {0}\r'.format(number), '{0:08d}\r'.format(number))
+        for number in range(50000))
+    ds_instance = _serial(ds_responses=ds_responses)
+    requests = [key.encode() for key in ds_responses]
+    ops = int(100000 * scale)
+    write = ds_instance.write
+    read = ds_instance.read
+
+    def loop():
+        for number in range(ops):
+            write(requests[number % 50000])
+            read(9)
+    return loop, ops, ops * 9
+
+
+@benchmark
+def write_response_table(scale):
+    """write() and read() against a 50k key ResponseTable."""
+    table = dummyserial.classes.ResponseTable(
+        ('READ {0}\r'.format(number), '{0:08d}\r'.format(number))
+        for number in range(50000))
+    ds_instance = _serial(ds_responses=table)
+    requests = list(table)
+    ops = int(100000 * scale)
+    write = ds_instance.write
+    read = ds_instance.read
+
+    def loop():
+        for number in range(ops):
+            write(requests[number % 50000])
+            read(9)
+    return loop, ops, ops * 9
+
+
+@benchmark
+def write_logging(scale):
+    """write() and read() with debug logging enabled (to os.devnull)."""
+    logger = logging.getLogger('dummyserial.classes')
+    ops = int(20000 * scale)
+
+    def loop():
+        with open(os.devnull, 'w') as devnull:
+            handlers = logger.handlers
+            level = logger.level
+            logger.handlers = [logging.StreamHandler(devnull)]
+            logger.setLevel(logging.DEBUG)
+            try:
+                ds_instance = _serial(
+                    ds_responses={'taco': 'yum'}, ds_debug=True)
+                for _ in range(ops):
+                    ds_instance.write(b'taco')
+                    ds_instance.read(3)
+            finally:
+                logger.handlers = handlers
+                logger.setLevel(level)
+    return loop, ops, ops * 3
+
+
+@benchmark
+def write_no_logging(scale):
+    """write() and read() with debug logging disabled."""
+    ds_instance = _serial(ds_responses={'taco': 'yum'})
+    ops = int(20000 * scale)
+
+    def loop():
+        for _ in range(ops):
+            ds_instance.write(b'taco')
+            ds_instance.read(3)
+    return loop, ops, ops * 3
+
+
+@benchmark
+def write_kiss(scale):
+    """KISS framed write() and read() of 256 byte payloads."""
+    codec = dummyserial.framing.KISSCodec()
+    payload = bytes(bytearray(range(256)))
+    ds_instance = _serial(
+        ds_framing=codec, ds_responses={payload.decode('latin1'): payload})
+    frame = codec.encode(payload)
+    ops = int(20000 * scale)
+
+    def loop():
+        for _ in range(ops):
+            ds_instance.write(frame)
+            ds_instance.read(len(frame))
+    return loop, ops, ops * len(frame)
+
+
+@benchmark
+def write_modbus_rtu(scale):
+    """Modbus RTU framed write() and read() of register reads."""
+    codec = dummyserial.framing.ModbusRTUCodec()
+    request = b'\x01\x03\x00\x00\x00\x02'
+    response = b'\x01\x03\x04\x00\x01\x00\x02'
+    ds_instance = _serial(
+        ds_framing=codec, ds_responses={request.decode('latin1'): response})
+    frame = codec.encode(request)
+    size = len(codec.encode(response))
+    ops = int(20000 * scale)
+
+    def loop():
+        for _ in range(ops):
+            ds_instance.write(frame)
+            ds_instance.read(size)
+    return loop, ops, ops * size
+
+
+@benchmark
+def write_latency(scale):
+    """write() and read() with a jittered latency on a virtual clock."""
+    ds_instance = _serial(
+        ds_responses={'taco': 'yum'},
+        ds_latency=dummyserial.classes.Latency(
+            0.01, 0.002, 'gauss', seed=1))
+    ops = int(100000 * scale)
+
+    def loop():
+        for _ in range(ops):
+            ds_instance.write(b'taco')
+            ds_instance.read(3)
+    return loop, ops, ops * 3
+
+
+@benchmark
+def read_timeout(scale):
+    """Short reads taking the timeout path on a virtual clock."""
+    ds_instance = _serial(timeout=2)
+    ops = int(100000 * scale)
+    read = ds_instance.read
+
+    def loop():
+        for _ in range(ops):
+            read(1)
+    return loop, ops, 0
+
+
+def run(names=None, scale=1.0, repeat=3):
+    """
+    Runs the named benchmarks (default all), best of repeat runs.
+
+    Returns a list of result dicts.
+    """
+    results = []
+    for func in BENCHMARKS:
+        if names and func.__name__ not in names:
+            continue
+        best = None
+        for _ in range(repeat):
+            loop, ops, size = func(scale)
+            start = time.perf_counter()
+            loop()
+            seconds = max(time.perf_counter() - start, 1e-9)
+            if best is None or seconds < best:
+                best = seconds
+        results.append({
+            'name': func.__name__,
+            'description': func.__doc__,
+            'ops': ops,
+            'bytes': size,
+            'seconds': best,
+            'ops_per_sec': ops / best,
+            'bytes_per_sec': size / best,
+        })
+    return results
+
+
+def import_time(module='dummyserial', repeat=3):
+    """
+    Returns the best cumulative import time of module in seconds, measured
+    with ``python -X importtime`` in a fresh interpreter, and the sorted
+    names of the modules that import pulled in.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    # Lets the first run write bytecode, so later runs time a warm import.
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    best = None
+    modules = None
+    for _ in range(repeat):
+        process = subprocess.Popen(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import sys; import {0}; print("\\n".join(sys.modules))'.format(
+                 module)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+            universal_newlines=True)
+        stdout, stderr = process.communicate()
+        if process.returncode:
+            raise RuntimeError(stderr)
+        for line in stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == module:
+                seconds = int(fields[1]) / 1e6
+                if best is None or seconds < best:
+                    best = seconds
+        modules = sorted(stdout.split())
+    return best, modules
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns (name, ratio) for every result whose ops/s fell below
+    (1 - tolerance) of the same benchmark in baseline.
+    """
+    previous = dict(
+        (result['name'], result) for result in baseline['results'])
+    regressions = []
+    for result in results:
+        old = previous.get(result['name'])
+        if old is None or not old['ops_per_sec']:
+            continue
+        ratio = result['ops_per_sec'] / old['ops_per_sec']
+        if ratio < 1 - tolerance:
+            regressions.append((result['name'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(
+        prog='python -m dummyserial.bench', description=__doc__.split('\n')[1])
+    parser.add_argument('names', nargs='*', help='benchmarks to run')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplier for the work done per benchmark')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write results as JSON to file')
+    parser.add_argument('--compare', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fractional ops/s slowdown')
+    parser.add_argument('--import-time', action='store_true',
+                        help='also measure the cold import time')
+    args = parser.parse_args(argv)
+
+    results = run(args.names, args.scale, args.repeat)
+    for result in results:
+        print('{name:24} {ops_per_sec:14,.0f} ops/s '
+              '{bytes_per_sec:16,.0f} bytes/s'.format(**result))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.time(),
+        'results': results,
+    }
+    if args.import_time:
+        seconds, modules = import_time(repeat=args.repeat)
+        report['import_time'] = seconds
+        report['import_serial'] = 'serial' in modules
+        print('{0:24} {1:14.1f} ms'.format('import_time', seconds * 1e3))
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline), args.tolerance)
+        for name, ratio in regressions:
+            print('REGRESSION {0}: {1:.0%} of baseline ops/s'.format(
+                name, ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
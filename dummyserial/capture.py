@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Capture and Replay.
+
+A :class:`Recorder` wraps a real `serial.Serial` and logs every write and
+read into a compact capture file. A :class:`Capture` opens that file through
+`mmap`, without loading it, and a :class:`Replay` answers the writes of a
+:class:`dummyserial.Serial` (as `ds_replay`) with the reads which followed
+the same write in the capture.
+
+The capture file is a header, a stream of records and an index::
+
+    header:  MAGIC
+    record:  kind (b'W' or b'R'), timestamp (float64), length (uint32),
+             payload
+    index:   file offset of every write record (uint64 each)
+    trailer: index offset (uint64), write count (uint64), TRAILER_MAGIC
+
+All integers are little-endian. A capture without an index, eg: from an
+interrupted recording, is indexed by scanning its records when opened.
+"""
+
+import array
+import mmap
+import struct
+import sys
+
+import dummyserial.classes
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+MAGIC = b'DSCAP\x00\x01\x00'
+TRAILER_MAGIC = b'DSINDEX\x00'
+WRITE = b'W'
+READ = b'R'
+
+RECORD = struct.Struct('<cdI')
+TRAILER = struct.Struct('<QQ8s')
+
+
+class Recorder(object):
+    """
+    Wraps a serial port, recording its writes and reads into a capture.
+
+    Other attributes are passed through to the wrapped port.
+
+    Args:
+        * serial_instance: The port to record, eg: a `serial.Serial`.
+        * path: Path of the capture file to create.
+        * clock: Clock timestamping the records, relative to the start of
+          the recording. Defaults to a real :class:`dummyserial.Clock`.
+    """
+
+    def __init__(self, serial_instance, path, clock=None):
+        self.serial = serial_instance
+        self.clock = clock or dummyserial.classes.Clock()
+        self._start = self.clock.time()
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._offset = len(MAGIC)
+        self._index = array.array('Q')
+
+    def __getattr__(self, name):
+        return getattr(self.serial, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _record(self, kind, data):
+        self._file.write(RECORD.pack(
+            kind, self.clock.time() - self._start, len(data)))
+        self._file.write(data)
+        self._offset += RECORD.size + len(data)
+
+    def write(self, data):
+        """Records and writes data to the wrapped port."""
+        self._index.append(self._offset)
+        self._record(WRITE, data)
+        return self.serial.write(data)
+
+    def _record_read(self, data):
+        """Records data returned by a read, and returns it."""
+        if data:
+            self._record(READ, data)
+        return data
+
+    def read(self, size=1):
+        """Reads from the wrapped port, recording any data returned."""
+        return self._record_read(self.serial.read(size))
+
+    def readinto(self, buf):
+        """Reads into buf from the wrapped port, recording any data read."""
+        size = self.serial.readinto(buf)
+        if size:
+            self._record(READ, bytes(memoryview(buf).cast('B')[:size]))
+        return size
+
+    def read_all(self):
+        """Reads all available data from the wrapped port, recording it."""
+        return self._record_read(self.serial.read_all())
+
+    def read_until(self, *args, **kwargs):
+        """Reads until a terminator from the wrapped port, recording it."""
+        return self._record_read(self.serial.read_until(*args, **kwargs))
+
+    def readline(self, *args, **kwargs):
+        """Reads a line from the wrapped port, recording it."""
+        return self._record_read(self.serial.readline(*args, **kwargs))
+
+    def readlines(self, *args, **kwargs):
+        """Reads lines from the wrapped port, recording each one."""
+        lines = self.serial.readlines(*args, **kwargs)
+        for line in lines:
+            self._record_read(line)
+        return lines
+
+    def close(self):
+        """Writes the index and closes the capture and the wrapped port."""
+        if self._file.closed:
+            return
+        if sys.byteorder != 'little':
+            self._index.byteswap()
+        self._file.write(self._index.tobytes())
+        self._file.write(TRAILER.pack(
+            self._offset, len(self._index), TRAILER_MAGIC))
+        self._file.close()
+        self.serial.close()
+
+
+class Capture(object):
+    """
+    Memory-mapped, read-only capture file.
+
+    Opening a capture maps the file and reads its index; records are only
+    touched when accessed, so very large captures open instantly.
+
+    Args:
+        * path: Path of the capture file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as capture_file:
+            self._mmap = mmap.mmap(
+                capture_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise dummyserial.exceptions.DSIOError(
+                'Not a capture file: {!r}'.format(path))
+        self._end, self._index = self._read_index()
+
+    def __len__(self):
+        """Returns the number of writes in the capture."""
+        return len(self._index)
+
+    def __repr__(self):
+        return '{0}.{1}({2!r}, writes={3})'.format(
+            self.__module__, self.__class__.__name__, self.path, len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Unmaps the capture file."""
+        self._mmap.close()
+
+    def _read_index(self):
+        """Returns the end of the records and the index of writes."""
+        size = len(self._mmap)
+        if size >= len(MAGIC) + TRAILER.size:
+            index_offset, count, magic = TRAILER.unpack_from(
+                self._mmap, size - TRAILER.size)
+            if (magic == TRAILER_MAGIC and
+                    index_offset + count * 8 + TRAILER.size == size):
+                index = array.array('Q')
+                index.frombytes(
+                    self._mmap[index_offset:index_offset + count * 8])
+                if sys.byteorder != 'little':
+                    index.byteswap()
+                return index_offset, index
+
+        # No index: scan the records, ignoring a truncated final record.
+        index = array.array('Q')
+        offset = len(MAGIC)
+        while offset + RECORD.size <= size:
+            kind, _, length = RECORD.unpack_from(self._mmap, offset)
+            if offset + RECORD.size + length > size:
+                break
+            if kind == WRITE:
+                index.append(offset)
+            offset += RECORD.size + length
+        return offset, index
+
+    def records(self, offset=None):
+        """
+        Yields (kind, timestamp, payload) records from the file offset,
+        defaulting to the first record. Payloads are memoryviews of the
+        mapped file.
+        """
+        if offset is None:
+            offset = len(MAGIC)
+        view = memoryview(self._mmap)
+        while offset < self._end:
+            kind, timestamp, length = RECORD.unpack_from(self._mmap, offset)
+            start = offset + RECORD.size
+            offset = start + length
+            yield kind, timestamp, view[start:offset]
+
+    def write_offset(self, number):
+        """Returns the file offset of write number, from the index."""
+        return self._index[number]
+
+    def exchange(self, number):
+        """
+        Returns write number and the list of reads which followed it, as
+        memoryviews of the mapped file.
+        """
+        records = self.records(self.write_offset(number))
+        _, _, request = next(records)
+        responses = []
+        for kind, _, payload in records:
+            if kind == WRITE:
+                break
+            responses.append(payload)
+        return request, responses
+
+
+class Replay(object):
+    """
+    Cursor answering writes from a :class:`Capture`, in order, for use as
+    `ds_replay`.
+
+    The nth write to the port is answered with the reads which followed
+    the nth write in the capture, whatever was written.
+
+    Args:
+        * capture: The :class:`Capture`, or the path of one.
+        * position: Number of the first write to replay.
+    """
+
+    def __init__(self, capture, position=0):
+        if not isinstance(capture, Capture):
+            capture = Capture(capture)
+        self.capture = capture
+        self.position = position
+
+    def __repr__(self):
+        return '{0}.{1}({2!r}, position={3})'.format(
+            self.__module__, self.__class__.__name__, self.capture,
+            self.position)
+
+    def seek(self, position):
+        """Moves the cursor to write number position."""
+        self.position = position
+
+    def respond(self, data):  # pylint: disable=W0613
+        """Returns the list of responses to the next write, data."""
+        if self.position >= len(self.capture):
+            return []
+        _, responses = self.capture.exchange(self.position)
+        self.position += 1
+        return responses
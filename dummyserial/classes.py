@@ -3,12 +3,14 @@
 
 """Dummy Serial Class Definitions"""
 
-import logging
-import logging.handlers
-import sys
+import array
+import bisect
+import collections
+import math
+import threading
 import time
 
-from serial.serialutil import SerialException, portNotOpenError
+from collections.abc import Mapping
 
 import dummyserial.constants
 
@@ -17,6 +19,884 @@ __license__ = 'Apache License, Version 2.0'
 __copyright__ = 'Copyright 2016 Orion Labs, Inc.'
 
 
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+_CHUNK_TYPES = _BYTES_TYPES + (str,)
+
+_DEFAULT_RESPONSE = (
+    dummyserial.constants.DEFAULT_RESPONSE.encode('latin1'))
+# Stand-in for the rx queues of a port until something is queued, so idle
+# ports do not each carry an empty deque.
+_EMPTY = ()
+
+# Numbered backreferences and conditional groups, which are renumbered when
+# a regex is wrapped in an alternation. Escaped backslashes may match too.
+_GROUP_REFERENCE = br'\\[1-9]|\(\?\(\d'
+
+
+class Clock(object):
+    """
+    Real (wall) clock used by :class:`Serial` to wait for data.
+
+    Provides the interface expected by the `ds_clock` argument of
+    :class:`Serial`: `time()`, `sleep()` and the `elapsed` property.
+    """
+
+    __slots__ = ('_start',)
+
+    def __init__(self):
+        self._start = self.time()
+
+    def __repr__(self):
+        return '{0}.{1}(elapsed={2!r})'.format(
+            self.__module__, self.__class__.__name__, self.elapsed)
+
+    def time(self):  # pylint: disable=R0201
+        """Returns the current device time in seconds."""
+        return time.monotonic()
+
+    def sleep(self, seconds):  # pylint: disable=R0201
+        """Blocks for the given number of seconds."""
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, condition, seconds):  # pylint: disable=R0201
+        """
+        Waits on the (acquired) `threading.Condition` for at most seconds,
+        or until notified if seconds is `None`.
+        """
+        condition.wait(seconds)
+
+    @property
+    def elapsed(self):
+        """Seconds of device time passed since this clock was created."""
+        return self.time() - self._start
+
+
+class VirtualClock(Clock):
+    """
+    Simulated clock whose `sleep()` advances device time instantly.
+
+    Useful for exercising timeout behaviour without waiting on the wall
+    clock, eg: a short `read()` with `timeout=2` returns immediately and
+    advances `elapsed` by two seconds.
+
+    Args:
+        * start: Initial device time in seconds.
+    """
+
+    __slots__ = ('_now',)
+
+    def __init__(self, start=0.0):
+        self._now = start
+        super(VirtualClock, self).__init__()
+
+    def time(self):
+        return self._now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self._now += seconds
+
+    advance = sleep
+
+    def wait(self, condition, seconds):
+        """
+        Advances device time by seconds without waiting on the condition,
+        as no other thread can advance a virtual clock while it waits.
+        """
+        if seconds is None:
+            condition.wait()
+        else:
+            self.sleep(seconds)
+
+
+class Latency(object):
+    """
+    Processing delay of a simulated device before a response becomes
+    readable: a fixed number of seconds, plus optional jitter drawn from a
+    `random.Random` seeded with seed, so runs are reproducible.
+
+    Args:
+        * seconds: Fixed (or mean) delay in seconds.
+        * jitter: Spread of the delay in seconds; its meaning depends on
+          distribution.
+        * distribution: 'uniform' (seconds +/- jitter), 'gauss' (normal
+          with standard deviation jitter) or 'exponential' (seconds plus an
+          exponential delay with mean jitter).
+        * seed: Seed of the PRNG.
+
+    Calling the latency returns the next delay, which is never negative.
+    """
+
+    __slots__ = ('seconds', 'jitter', 'distribution', '_sample')
+
+    def __init__(self, seconds=0.0, jitter=0.0, distribution='uniform',
+                 seed=None):
+        self.seconds = seconds
+        self.jitter = jitter
+        self.distribution = distribution
+        if not jitter:
+            self._sample = None
+            return
+
+        import random
+        prng = random.Random(seed)
+        if distribution == 'uniform':
+            self._sample = lambda: prng.uniform(
+                seconds - jitter, seconds + jitter)
+        elif distribution == 'gauss':
+            self._sample = lambda: prng.gauss(seconds, jitter)
+        elif distribution == 'exponential':
+            rate = 1.0 / jitter
+            self._sample = lambda: seconds + prng.expovariate(rate)
+        else:
+            raise dummyserial.exceptions.DSIOError(
+                'Unknown latency distribution: {!r}'.format(distribution))
+
+    def __repr__(self):
+        return '{0}.{1}({2!r}, jitter={3!r}, distribution={4!r})'.format(
+            self.__module__, self.__class__.__name__, self.seconds,
+            self.jitter, self.distribution)
+
+    def __call__(self):
+        if self._sample is None:
+            return self.seconds
+        return max(0.0, self._sample())
+
+
+class Delayed(object):
+    """
+    A response which becomes readable only after latency, for use as a
+    value of `ds_responses`, a :class:`RuleTable` response or the return
+    value of a rule callable.
+
+    Args:
+        * response: The response (bytes, str or a lazy response).
+        * latency: Seconds, or a :class:`Latency`, sampled each time the
+          response is sent.
+    """
+
+    __slots__ = ('response', 'latency')
+
+    def __init__(self, response, latency):
+        self.response = _to_bytes(response)
+        self.latency = latency
+
+    def __repr__(self):
+        return '{0}.{1}({2!r}, {3!r})'.format(
+            self.__module__, self.__class__.__name__, self.response,
+            self.latency)
+
+    def delay(self):
+        """Returns the seconds before this sending of the response."""
+        if callable(self.latency):
+            return self.latency()
+        return self.latency
+
+
+class Impairment(object):
+    """
+    Line noise applied to the data a port receives: bit flips, dropped
+    bytes and inserted garbage bytes, each at a per-byte rate.
+
+    The positions of errors are drawn as geometric gaps between them from
+    a `random.Random` seeded with seed, so a clean stretch of data costs
+    nothing beyond a copy regardless of its length, and runs are
+    reproducible.
+
+    Args:
+        * flip_rate: Probability of a byte having one bit flipped.
+        * drop_rate: Probability of a byte being dropped.
+        * insert_rate: Probability of a garbage byte being inserted before
+          a byte.
+        * seed: Seed of the PRNG.
+
+    The counts of flipped, dropped and inserted bytes are kept as `flips`,
+    `drops` and `inserts`.
+    """
+
+    __slots__ = ('flip_rate', 'drop_rate', 'insert_rate', 'flips', 'drops',
+                 'inserts', '_random')
+
+    def __init__(self, flip_rate=0.0, drop_rate=0.0, insert_rate=0.0,
+                 seed=None):
+        import random
+        self.flip_rate = flip_rate
+        self.drop_rate = drop_rate
+        self.insert_rate = insert_rate
+        self.flips = 0
+        self.drops = 0
+        self.inserts = 0
+        self._random = random.Random(seed)
+
+    def __repr__(self):
+        return (
+            '{0}.{1}(flip_rate={2!r}, drop_rate={3!r}, insert_rate={4!r})'
+            .format(self.__module__, self.__class__.__name__,
+                    self.flip_rate, self.drop_rate, self.insert_rate))
+
+    def _positions(self, rate, size):
+        """
+        Returns the sorted positions in range(size) at which independent
+        events of probability rate occur.
+        """
+        if rate <= 0 or not size:
+            return []
+        if rate >= 1:
+            return list(range(size))
+        uniform = self._random.random
+        scale = 1.0 / math.log(1.0 - rate)
+        positions = []
+        position = -1
+        while True:
+            position += 1 + int(math.log(1.0 - uniform()) * scale)
+            if position >= size:
+                return positions
+            positions.append(position)
+
+    def __call__(self, data):
+        """Returns data as received over the impaired line."""
+        size = len(data)
+        flips = self._positions(self.flip_rate, size)
+        drops = self._positions(self.drop_rate, size)
+        inserts = self._positions(self.insert_rate, size)
+        if not (flips or drops or inserts):
+            return data
+
+        data = bytearray(data)
+        getrandbits = self._random.getrandbits
+        for position in flips:
+            data[position] ^= 1 << getrandbits(3)
+        self.flips += len(flips)
+        if not (drops or inserts):
+            return data
+
+        # Splice the dropped and inserted bytes in one pass; an insert at
+        # the position of a drop goes before the dropped byte.
+        view = memoryview(data)
+        pieces = []
+        start = 0
+        for position, drop in sorted(
+                [(position, True) for position in drops] +
+                [(position, False) for position in inserts]):
+            pieces.append(view[start:position])
+            if drop:
+                start = position + 1
+            else:
+                pieces.append(bytearray((getrandbits(8),)))
+                start = position
+        pieces.append(view[start:])
+        self.drops += len(drops)
+        self.inserts += len(inserts)
+        return b''.join(pieces)
+
+
+TraceRecord = collections.namedtuple('TraceRecord', 'event port time data')
+
+
+def _noop(*args, **kwargs):  # pylint: disable=W0613
+    """Stand-in for disabled logging calls."""
+    pass
+
+
+def _to_bytes(data):
+    """
+    Encodes a str response as latin1 bytes, passes bytes (and lazy
+    responses) through.
+    """
+    if isinstance(data, str):
+        return data.encode('latin1')
+    return data
+
+
+def _iter_chunks(response):
+    """
+    Yields the chunks of a lazy response: a file object, a callable
+    returning chunks (empty or `None` once exhausted), or an iterable.
+
+    Seekable files are read from their start by every use, each use keeping
+    its own position. A callable may instead be a factory returning a fresh
+    iterable of chunks (or file) for every use, eg: a generator function.
+    Iterators, such as generator objects, and unseekable files are
+    exhausted by their first use.
+    """
+    if hasattr(response, 'read'):
+        seekable = hasattr(response, 'seekable') and response.seekable()
+        position = 0
+        while True:
+            if seekable:
+                response.seek(position)
+            chunk = response.read(dummyserial.constants.RESPONSE_CHUNK_SIZE)
+            if not chunk:
+                return
+            if seekable:
+                position = response.tell()
+            yield _to_bytes(chunk)
+    elif callable(response):
+        chunk = response()
+        if chunk is not None and not isinstance(chunk, _CHUNK_TYPES):
+            yield from _iter_chunks(chunk)
+            return
+        while chunk:
+            yield _to_bytes(chunk)
+            chunk = response()
+    else:
+        for chunk in response:
+            if chunk:
+                yield _to_bytes(chunk)
+
+
+def _encode_response(response):
+    """Encodes a response unless it is a callable."""
+    if callable(response):
+        return response
+    return _to_bytes(response)
+
+
+def _call_response(response, request, match):
+    """Returns the bytes for an encoded response."""
+    if callable(response):
+        return _to_bytes(response(request, match))
+    return response
+
+
+class ByteBuffer(object):
+    """
+    FIFO byte buffer backed by a single `bytearray`.
+
+    Reads advance an offset rather than slicing off the remaining data, and
+    the consumed head is compacted away only once it makes up most of the
+    storage. Byte-at-a-time and bulk reads both run in amortized linear
+    time, and `readinto()` copies straight into the caller's buffer.
+
+    Args:
+        * data: Initial contents of the buffer.
+    """
+
+    __slots__ = ('_data', '_offset')
+
+    def __init__(self, data=b''):
+        self._data = bytearray(data)
+        self._offset = 0
+
+    def __len__(self):
+        return len(self._data) - self._offset
+
+    def __bool__(self):
+        return len(self._data) > self._offset
+
+    def __repr__(self):
+        return '{0}.{1}({2!r})'.format(
+            self.__module__, self.__class__.__name__, self.peek())
+
+    def write(self, data):
+        """Appends data to the end of the buffer."""
+        self._data += data
+
+    def peek(self, size=None):
+        """Returns up to size bytes without consuming them."""
+        end = len(self._data)
+        if size is not None:
+            end = min(end, self._offset + size)
+        return bytes(self._data[self._offset:end])
+
+    def read(self, size):
+        """Consumes and returns up to size bytes."""
+        start = self._offset
+        end = min(len(self._data), start + size)
+        if start == 0 and end == len(self._data):
+            chunk = bytes(self._data)
+        else:
+            view = memoryview(self._data)
+            chunk = view[start:end].tobytes()
+            view.release()
+        self._consume(end - start)
+        return chunk
+
+    def readinto(self, buf):
+        """
+        Consumes bytes into the writable buffer buf.
+
+        Returns the number of bytes copied.
+        """
+        dst = memoryview(buf).cast('B')
+        size = min(len(dst), len(self))
+        src = memoryview(self._data)
+        dst[:size] = src[self._offset:self._offset + size]
+        src.release()
+        dst.release()
+        self._consume(size)
+        return size
+
+    def find(self, sub, start=0, end=None):
+        """
+        Returns the lowest index of sub within buffer[start:end], or -1.
+        The buffer is searched in place.
+        """
+        if end is None:
+            end = len(self)
+        index = self._data.find(
+            sub, self._offset + start, self._offset + end)
+        if index < 0:
+            return index
+        return index - self._offset
+
+    def discard(self, size):
+        """Consumes up to size bytes without returning them."""
+        self._consume(min(size, len(self)))
+
+    def clear(self):
+        """Discards the contents of the buffer."""
+        del self._data[:]
+        self._offset = 0
+
+    def _consume(self, size):
+        self._offset += size
+        if self._offset == len(self._data):
+            del self._data[:]
+            self._offset = 0
+        elif (self._offset >= dummyserial.constants.BUFFER_COMPACT_SIZE and
+              self._offset * 2 >= len(self._data)):
+            del self._data[:self._offset]
+            self._offset = 0
+
+
+class StreamMatcher(object):
+    """
+    Aho-Corasick automaton for finding request keys in a byte stream.
+
+    The automaton is immutable once built, and the scan position is kept
+    by the caller as an integer state, so one matcher can be shared by any
+    number of ports. Scanning costs O(bytes scanned) regardless of the
+    number of keys.
+
+    When a key is completed the scan restarts from the root, so matches do
+    not overlap and the first key to complete wins. Where several keys end
+    at the same byte the longest one is reported. Empty keys never match.
+
+    Args:
+        * keys: Iterable of request keys (bytes or latin1 str).
+    """
+
+    def __init__(self, keys):
+        self.keys = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [-1]
+
+        for key in keys:
+            encoded = bytearray(_to_bytes(key))
+            if not encoded:
+                continue
+            state = 0
+            for byte in encoded:
+                nxt = self._goto[state].get(byte)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(-1)
+                    self._goto[state][byte] = nxt
+                state = nxt
+            self._out[state] = len(self.keys)
+            self.keys.append(key)
+
+        # Breadth-first construction of the failure links. A state without
+        # its own output inherits the output of its failure state, which is
+        # the longest key that is a proper suffix of the state.
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for byte, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and byte not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(byte, 0)
+                self._fail[nxt] = fail
+                if self._out[nxt] < 0:
+                    self._out[nxt] = self._out[fail]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def scan(self, data, state=0):
+        """
+        Scans data starting from the given state.
+
+        Returns a tuple of the list of matched keys, in order, and the state
+        to resume the next scan from.
+        """
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        matches = []
+        for byte in bytearray(data):
+            while True:
+                nxt = goto[state].get(byte)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            if out[state] >= 0:
+                matches.append(self.keys[out[state]])
+                state = 0
+        return matches, state
+
+
+class ResponseTable(Mapping):
+    """
+    Immutable table of pre-encoded request and response bytes.
+
+    Keys and values are encoded once when the table is built, so ports
+    using it as their `ds_responses` look up written bytes directly and
+    never encode on the read/write path. A table can be shared by any
+    number of ports, along with the :class:`StreamMatcher` built from its
+    keys for `ds_streaming`.
+
+    Args:
+        * responses: Mapping or iterable of (request, response) pairs, as
+          bytes or latin1 str.
+    """
+
+    __slots__ = ('_responses', '_matcher')
+
+    def __init__(self, responses=()):
+        if isinstance(responses, Mapping):
+            responses = responses.items()
+        self._responses = dict(
+            (_to_bytes(request), _to_bytes(response))
+            for request, response in responses)
+        self._matcher = None
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Builds a table from a JSON object of requests to responses stored
+        in path. Strings are encoded as latin1.
+        """
+        import json  # pylint: disable=C0415
+        with open(path) as json_file:
+            return cls(json.load(json_file))
+
+    def __getitem__(self, request):
+        return self._responses[request]
+
+    def __iter__(self):
+        return iter(self._responses)
+
+    def __len__(self):
+        return len(self._responses)
+
+    def __contains__(self, request):
+        return request in self._responses
+
+    def __repr__(self):
+        return '{0}.{1}<{2} responses>'.format(
+            self.__module__, self.__class__.__name__, len(self))
+
+    def get(self, request, default=None):
+        return self._responses.get(request, default)
+
+    @property
+    def matcher(self):
+        """Shared :class:`StreamMatcher` built from the table's keys."""
+        if self._matcher is None:
+            self._matcher = StreamMatcher(self)
+        return self._matcher
+
+
+def _alternation(rules):
+    """
+    Joins the (number, pattern) regex rules into one alternation.
+
+    Returns a tuple of the compiled alternation, a dict mapping the group
+    wrapping each rule to its number, and `None`.
+    """
+    import re  # pylint: disable=C0415
+    parts = []
+    groups = {}
+    group = 1
+    for number, pattern in rules:
+        parts.append(b'(' + pattern.pattern + b')')
+        groups[group] = number
+        group += 1 + pattern.groups
+    return re.compile(b'|'.join(parts)), groups, None
+
+
+class RuleTable(object):
+    """
+    Table of literal, prefix, regex and callable response rules.
+
+    Rules are compiled once, on first lookup, into a dispatch index which is
+    consulted in order: a hash of literal requests, a byte trie of prefixes
+    (longest prefix wins), alternations of the regexes (first rule wins)
+    and finally the callables, in the order they were added. Lookups
+    against the first three cost roughly the same however many rules are
+    in the table, except that regexes with flags or numbered group
+    references are matched one by one.
+
+    Responses are bytes or latin1 str, or a callable which is passed the
+    request and the regex match object (`None` for other rule kinds) and
+    returns the response. Regex rules must match the whole request.
+
+    Args:
+        * rules: Iterable of (kind, pattern, response) tuples, where kind is
+          one of 'literal', 'prefix' or 'regex'; or ('callable', func) where
+          func(request) returns a response or `None`.
+    """
+
+    def __init__(self, rules=None):
+        self._literals = {}
+        self._prefixes = []
+        self._regexes = []
+        self._callables = []
+        self._index = None
+        for rule in rules or ():
+            self.add(*rule)
+
+    def __len__(self):
+        return (len(self._literals) + len(self._prefixes) +
+                len(self._regexes) + len(self._callables))
+
+    def add(self, kind, pattern, response=None):
+        """Adds a rule of the given kind."""
+        adder = getattr(self, 'add_' + kind, None)
+        if adder is None:
+            raise dummyserial.exceptions.DSTypeError(
+                'Unknown rule kind: {!r}'.format(kind))
+        if kind == 'callable':
+            return adder(pattern)
+        return adder(pattern, response)
+
+    def add_literal(self, request, response):
+        """Adds a rule matching exactly request."""
+        self._literals[_to_bytes(request)] = _encode_response(response)
+        self._index = None
+
+    def add_prefix(self, prefix, response):
+        """Adds a rule matching any request starting with prefix."""
+        self._prefixes.append((_to_bytes(prefix), _encode_response(response)))
+        self._index = None
+
+    def add_regex(self, pattern, response):
+        """Adds a rule matching requests which fully match pattern."""
+        import re  # pylint: disable=C0415
+        if not hasattr(pattern, 'pattern'):
+            pattern = re.compile(_to_bytes(pattern))
+        elif isinstance(pattern.pattern, str):
+            pattern = re.compile(
+                _to_bytes(pattern.pattern), pattern.flags & ~re.UNICODE)
+        self._regexes.append((pattern, _encode_response(response)))
+        self._index = None
+
+    def add_callable(self, func):
+        """Adds a rule calling func(request), which returns a response or
+        `None` if the request is not handled."""
+        self._callables.append(func)
+        self._index = None
+
+    def compile(self):
+        """Builds the dispatch index. Called implicitly by `lookup()`."""
+        import re  # pylint: disable=C0415
+        trie = {}
+        for prefix, response in self._prefixes:
+            node = trie
+            for byte in bytearray(prefix):
+                node = node.setdefault(byte, {})
+            node.setdefault(None, response)
+
+        # Runs of rules are joined into one alternation, splitting wherever
+        # a rule reuses a group name of the run. Rules with flags or group
+        # references, whose meaning depends on the rule's own flags and
+        # group numbers, are matched on their own.
+        regexes = []
+        run = []
+        names = set()
+        for number, (pattern, _) in enumerate(self._regexes):
+            alone = bool(pattern.flags & ~re.ASCII or
+                         re.search(_GROUP_REFERENCE, pattern.pattern))
+            if run and (alone or names.intersection(pattern.groupindex)):
+                regexes.append(_alternation(run))
+                run = []
+                names = set()
+            if alone:
+                regexes.append((pattern, None, number))
+            else:
+                run.append((number, pattern))
+                names.update(pattern.groupindex)
+        if run:
+            regexes.append(_alternation(run))
+
+        self._index = (trie, regexes)
+        return self
+
+    def lookup(self, request):
+        """Returns the response bytes for request, or `None`."""
+        if self._index is None:
+            self.compile()
+        trie, regexes = self._index
+
+        response = self._literals.get(request)
+        if response is not None:
+            return _call_response(response, request, None)
+
+        node = trie
+        for byte in bytearray(request):
+            if None in node:
+                response = node[None]
+            node = node.get(byte)
+            if node is None:
+                break
+        else:
+            response = node.get(None, response)
+        if response is not None:
+            return _call_response(response, request, None)
+
+        for combined, groups, number in regexes:
+            match = combined.fullmatch(request)
+            if match is not None:
+                if groups is not None:
+                    number = groups[match.lastindex]
+                pattern, response = self._regexes[number]
+                return _call_response(
+                    response, request, pattern.fullmatch(request))
+
+        for func in self._callables:
+            response = func(request)
+            if response is not None:
+                return _to_bytes(response)
+        return None
+
+
+class SerialStats(object):
+    """
+    Per-port counters and fixed-bucket histograms.
+
+    Counters are plain integers and histograms are `array` buckets, cheap
+    enough to be left on under load. Histogram bucket `i` counts values
+    up to and including `bounds[i]`; the final bucket counts the rest.
+
+    Counters:
+        * read_calls, read_bytes: Calls to and bytes returned by reads.
+        * write_calls, write_bytes: Calls to and bytes passed to writes.
+        * matched_writes, unmatched_writes: Writes which did or did not
+          produce a response.
+        * timeouts: Reads which waited for more data than was available.
+        * rx_overruns, tx_overruns: Bytes discarded because they did not
+          fit in the bounded receive or transmit FIFO.
+        * blocked_time: Total device seconds spent waiting in reads.
+    """
+
+    __slots__ = dummyserial.constants.STATS_COUNTERS + (
+        'blocked_time', 'read_sizes', 'blocked_times')
+
+    read_size_bounds = dummyserial.constants.STATS_READ_SIZE_BOUNDS
+    blocked_time_bounds = dummyserial.constants.STATS_BLOCKED_TIME_BOUNDS
+
+    def __init__(self):
+        self.read_sizes = array.array(
+            'L', [0] * (len(self.read_size_bounds) + 1))
+        self.blocked_times = array.array(
+            'L', [0] * (len(self.blocked_time_bounds) + 1))
+        self.reset()
+
+    def __repr__(self):
+        return '{0}.{1}({2!r})'.format(
+            self.__module__, self.__class__.__name__, self.snapshot())
+
+    def reset(self):
+        """Zeroes all counters and histograms."""
+        for counter in dummyserial.constants.STATS_COUNTERS:
+            setattr(self, counter, 0)
+        self.blocked_time = 0.0
+        for histogram in (self.read_sizes, self.blocked_times):
+            for bucket in range(len(histogram)):
+                histogram[bucket] = 0
+
+    def record_read(self, size):
+        """Counts a read returning size bytes."""
+        self.read_calls += 1
+        self.read_bytes += size
+        self.read_sizes[bisect.bisect_left(self.read_size_bounds, size)] += 1
+
+    def record_write(self, size, matched):
+        """Counts a write of size bytes."""
+        self.write_calls += 1
+        self.write_bytes += size
+        if matched:
+            self.matched_writes += 1
+        else:
+            self.unmatched_writes += 1
+
+    def record_rx_overrun(self, size):
+        """Counts size bytes discarded from the receive FIFO."""
+        self.rx_overruns += size
+
+    def record_tx_overrun(self, size):
+        """Counts size bytes discarded from the transmit FIFO."""
+        self.tx_overruns += size
+
+    def record_timeout(self, seconds):
+        """Counts a read which blocked for seconds."""
+        self.timeouts += 1
+        self.blocked_time += seconds
+        self.blocked_times[
+            bisect.bisect_left(self.blocked_time_bounds, seconds)] += 1
+
+    def snapshot(self):
+        """Returns a dict of the current counters and histograms."""
+        snapshot = dict(
+            (counter, getattr(self, counter))
+            for counter in dummyserial.constants.STATS_COUNTERS)
+        snapshot['blocked_time'] = self.blocked_time
+        snapshot['read_sizes'] = self.read_sizes.tolist()
+        snapshot['blocked_times'] = self.blocked_times.tolist()
+        return snapshot
+
+    @staticmethod
+    def aggregate(snapshots):
+        """
+        Sums snapshots (or :class:`SerialStats`), eg: of many ports, into
+        a single snapshot dict.
+        """
+        total = SerialStats().snapshot()
+        for snapshot in snapshots:
+            if isinstance(snapshot, SerialStats):
+                snapshot = snapshot.snapshot()
+            for key, value in snapshot.items():
+                if isinstance(value, list):
+                    total[key] = [a + b for a, b in zip(total[key], value)]
+                else:
+                    total[key] += value
+        return total
+
+
+class TraceBuffer(object):
+    """
+    Structured trace sink keeping the most recent :data:`TraceRecord` of a
+    port's activity, for use as `ds_trace`.
+
+    Args:
+        * maxlen: Maximum number of records kept, or `None` for no limit.
+    """
+
+    def __init__(self, maxlen=dummyserial.constants.TRACE_MAXLEN):
+        self.records = collections.deque(maxlen=maxlen)
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def __len__(self):
+        return len(self.records)
+
+    def clear(self):
+        """Discards all records."""
+        self.records.clear()
+
+
 class Serial(object):
     """
     Dummy (mock) serial port for testing purposes.
@@ -25,29 +905,132 @@ class Serial(object):
     `pySerial <http://pyserial.sourceforge.net/>`_ module.
 
     Args:
-        * port:
-        * timeout:
+        * port: Serial port name.
+        * timeout: Read timeout in seconds.
+        * ds_responses: Dictionary of write data to read responses, or a
+          :class:`ResponseTable` to share pre-encoded responses between
+          ports. Responses may be lazy: file objects, callables returning
+          chunks, or iterables of chunks, read only as the port is read.
+          Seekable files, and factories returning a fresh iterable for each
+          use (eg: a generator function), are replayed by every write;
+          iterators, such as generator objects, are used up by the first.
+        * ds_clock: Clock used for timeouts, eg: :class:`VirtualClock`.
+          Defaults to a real :class:`Clock`.
+        * ds_pacing: If `True`, responses are released into the input
+          buffer at the character rate implied by baudrate, bytesize,
+          parity and stopbits, measured on `ds_clock`.
+        * ds_streaming: If `True`, written bytes are accumulated and scanned
+          for every `ds_responses` key, so requests may be split across or
+          pipelined within writes. Each match appends its response to the
+          waiting data. Otherwise each write must be exactly one key, and
+          replaces the waiting data.
+        * ds_rules: :class:`RuleTable` consulted for exact writes which are
+          not found in `ds_responses`.
+        * ds_replay: :class:`dummyserial.capture.Replay` answering writes
+          with captured reads, appended to the waiting data.
+        * ds_session: :class:`dummyserial.session.Session` answering writes
+          from a stateful script, appended to the waiting data.
+        * ds_framing: Codec from :mod:`dummyserial.framing`. Frames are
+          decoded out of written bytes, their payloads looked up in
+          `ds_responses` and `ds_rules`, and the framed responses appended
+          to the waiting data.
+        * ds_latency: Seconds, or a :class:`Latency`, before each response
+          becomes readable, unless the response is :class:`Delayed`.
+          Measured on `ds_clock`, so a :class:`VirtualClock` simulates
+          latency without waiting.
+        * ds_impairment: :class:`Impairment` applied to all data the port
+          receives, before it is waiting to be read.
+        * ds_rx_capacity: Bytes the receive FIFO holds, or `None` (the
+          default) for no limit.
+        * ds_tx_capacity: Bytes the transmit FIFO holds, or `None`. Only
+          applies with `ds_pacing`, as otherwise written bytes are sent
+          instantly.
+        * ds_overflow: What happens to data which does not fit in a FIFO:
+          'drop-newest' (the default) discards it, like a UART overrun;
+          'drop-oldest' discards the oldest waiting bytes; 'block' holds off
+          the writer; 'raise' raises :class:`DSOverflowError`. Discarded
+          bytes are counted as `rx_overruns` and `tx_overruns` in `stats`.
+        * ds_debug: If `False`, logging calls are bound to a no-op when the
+          port is created, removing them from the read/write path.
+        * ds_trace: Callable passed a :data:`TraceRecord` for every 'write',
+          'read' and 'timeout', eg: a :class:`TraceBuffer`.
+
+    With 'block', data for a full receive FIFO is left with its producer
+    (a lazy response is not pulled, written bytes are kept by reference)
+    until reads make room. Once :data:`MAX_HELD_RESPONSES` responses are
+    held off, writes raise `SerialTimeoutException`, as nothing can read
+    while a single-threaded port waits. A :class:`ThreadSafeSerial`
+    writing to a linked peer instead waits, up to `write_timeout`, for the
+    peer's reader to take the data held off by its previous write; a write
+    which times out is not delivered. A paced write to a full transmit FIFO
+    waits for it to drain, up to `write_timeout`.
+
+    The remaining pySerial settings (bytesize, parity, stopbits, xonxoff,
+    rtscts, dsrdtr, write_timeout and inter_byte_timeout) are accepted and
+    stored as attributes. The port's :class:`SerialStats` are available as
+    `stats`.
+
+    The rts, dtr and break_condition outputs may be set. The cts, dsr, ri and
+    cd inputs follow a linked peer's outputs as wired in a null-modem cable,
+    or loop back this port's own outputs when unlinked.
+
+    Ports use `__slots__`, so that tens of thousands of them fit in one
+    process; an idle port costs about 1KB. A `__dict__` is kept for other
+    attributes, eg: methods patched by `mock`, and is only allocated once
+    one is set. Subclasses adding attributes should declare their own
+    `__slots__`.
 
     Note:
-    As the portname argument not is used properly, only one port on
-    :mod:`dummyserial` can be used simultaneously.
+    Each instance is an independent device. Use a :class:`PortRegistry` to
+    share a device between handles opened by port name, or `link()` two
+    ports into a null-modem pair.
     """
 
-    _logger = logging.getLogger(__name__)
-    if not _logger.handlers:
-        _logger.setLevel(dummyserial.constants.LOG_LEVEL)
-        _console_handler = logging.StreamHandler()
-        _console_handler.setLevel(dummyserial.constants.LOG_LEVEL)
-        _console_handler.setFormatter(dummyserial.constants.LOG_FORMAT)
-        _logger.addHandler(_console_handler)
-        _logger.propagate = False
+    __slots__ = (
+        'port', 'initial_port_name', 'timeout', 'baudrate', 'bytesize',
+        'parity', 'stopbits', 'xonxoff', 'rtscts', 'dsrdtr', 'write_timeout',
+        'inter_byte_timeout', 'rts', 'dtr', 'break_condition',
+        'ds_responses', 'ds_clock', 'ds_pacing', 'ds_streaming', 'ds_rules',
+        'ds_replay', 'ds_session', 'ds_framing', 'ds_latency',
+        'ds_impairment', 'ds_rx_capacity', 'ds_tx_capacity', 'ds_overflow',
+        'ds_debug', 'ds_trace', 'stats', '_debug', '_isOpen', '_waiting_data',
+        '_responder', '_encoded', '_matcher', '_match_state',
+        '_framing_state', '_rx_schedule', '_rx_held', '_rx_line_free',
+        '_rx_resets', '_rx_sources', '_tx_line_free', '_peer',
+        '__dict__', '__weakref__')
+
+    @staticmethod
+    def _setup_logging():
+        """
+        Installs the console handler on the module logger, unless it
+        already has handlers, and returns the logger. Called when the first
+        port with `ds_debug` is created, so that importing dummyserial does
+        not import logging.
+        """
+        import logging  # pylint: disable=C0415
+        logger = logging.getLogger(__name__)
+        if not logger.handlers:
+            logger.setLevel(dummyserial.constants.LOG_LEVEL)
+            console_handler = logging.StreamHandler()
+            console_handler.setLevel(dummyserial.constants.LOG_LEVEL)
+            console_handler.setFormatter(dummyserial.constants.LOG_FORMAT)
+            logger.addHandler(console_handler)
+            logger.propagate = False
+        return logger
 
     def __init__(self, *args, **kwargs):
-        self._logger.debug('args=%s', args)
-        self._logger.debug('kwargs=%s', kwargs)
+        self.ds_debug = kwargs.get('ds_debug', True)
+        self.ds_trace = kwargs.get('ds_trace')
+        if self.ds_debug:
+            self._debug = self._setup_logging().debug
+        else:
+            self._debug = _noop
+
+        self._debug('args=%s', args)
+        self._debug('kwargs=%s', kwargs)
 
         self._isOpen = True  # pylint: disable=C0103
-        self._waiting_data = dummyserial.constants.NO_DATA_PRESENT
+        self._waiting_data = ByteBuffer()
 
         self.port = kwargs['port']  # Serial port name.
         self.initial_port_name = self.port  # Initial name given to the port
@@ -57,6 +1040,64 @@ class Serial(object):
             'timeout', dummyserial.constants.DEFAULT_TIMEOUT)
         self.baudrate = kwargs.get(
             'baudrate', dummyserial.constants.DEFAULT_BAUDRATE)
+        self.bytesize = kwargs.get(
+            'bytesize', dummyserial.constants.DEFAULT_BYTESIZE)
+        self.parity = kwargs.get(
+            'parity', dummyserial.constants.DEFAULT_PARITY)
+        self.stopbits = kwargs.get(
+            'stopbits', dummyserial.constants.DEFAULT_STOPBITS)
+        self.xonxoff = kwargs.get('xonxoff', False)
+        self.rtscts = kwargs.get('rtscts', False)
+        self.dsrdtr = kwargs.get('dsrdtr', False)
+        self.write_timeout = kwargs.get('write_timeout')
+        self.inter_byte_timeout = kwargs.get('inter_byte_timeout')
+        self.rts = True
+        self.dtr = True
+        self.break_condition = False
+        self.ds_clock = kwargs.get('ds_clock') or Clock()
+        self.ds_pacing = kwargs.get('ds_pacing', False)
+        self.ds_streaming = kwargs.get('ds_streaming', False)
+        self.ds_rules = kwargs.get('ds_rules')
+        self.ds_replay = kwargs.get('ds_replay')
+        self.ds_session = kwargs.get('ds_session')
+        self.ds_framing = kwargs.get('ds_framing')
+        self._framing_state = b''
+        self.ds_latency = kwargs.get('ds_latency')
+        self.ds_impairment = kwargs.get('ds_impairment')
+        self.ds_rx_capacity = kwargs.get('ds_rx_capacity')
+        self.ds_tx_capacity = kwargs.get('ds_tx_capacity')
+        self.ds_overflow = kwargs.get(
+            'ds_overflow', dummyserial.constants.DEFAULT_OVERFLOW)
+        if self.ds_overflow not in dummyserial.constants.OVERFLOW_POLICIES:
+            raise dummyserial.exceptions.DSIOError(
+                'Unknown overflow policy: {!r}'.format(self.ds_overflow))
+        self._responder = self.ds_replay
+        if self._responder is None:
+            self._responder = self.ds_session
+
+        self._encoded = isinstance(self.ds_responses, ResponseTable)
+        self._matcher = None
+        self._match_state = 0
+        if self.ds_streaming:
+            if self._encoded:
+                self._matcher = self.ds_responses.matcher
+            else:
+                self._matcher = StreamMatcher(self.ds_responses)
+
+        # Segments of [start time, byte count] of waiting data which has
+        # not been released by pacing yet, and their total byte count.
+        self._rx_schedule = _EMPTY
+        self._rx_held = 0
+        self._rx_line_free = 0.0
+        self._rx_resets = 0
+        # Lazy responses yet to be materialized, as [iterator of chunks,
+        # latency, remainder of a chunk split to fit ds_rx_capacity].
+        self._rx_sources = _EMPTY
+        # Device time at which the paced transmitter becomes idle.
+        self._tx_line_free = 0.0
+
+        self.stats = SerialStats()
+        self._peer = None
 
     def __repr__(self):
         """String representation of the DummySerial object."""
@@ -69,27 +1110,298 @@ class Serial(object):
                 self._isOpen,
                 self.port,
                 self.timeout,
-                self._waiting_data,
+                self._waiting_data.peek(),
             )
         )
 
     def open(self):
         """Open a (previously initialized) port."""
-        self._logger.debug('Opening port')
+        self._debug('Opening port')
 
         if self._isOpen:
-            raise SerialException('Port is already open.')
+            raise dummyserial.exceptions.serial_exception(
+                'Port is already open.')
 
         self._isOpen = True
         self.port = self.initial_port_name
 
     def close(self):
         """Close a port on dummy_serial."""
-        self._logger.debug('Closing port')
+        self._debug('Closing port')
         if self._isOpen:
             self._isOpen = False
         self.port = None
 
+    @property
+    def ds_char_time(self):
+        """
+        Seconds taken to transfer a single character at the configured
+        baudrate, bytesize, parity and stopbits (including the start bit).
+        """
+        bits = 1 + int(self.bytesize) + float(self.stopbits)
+        if self.parity != dummyserial.constants.PARITY_NONE:
+            bits += 1
+        return bits / float(self.baudrate)
+
+    @property
+    def cts(self):
+        """Clear To Send input, wired to the peer's rts."""
+        return (self._peer or self).rts
+
+    @property
+    def dsr(self):
+        """Data Set Ready input, wired to the peer's dtr."""
+        return (self._peer or self).dtr
+
+    @property
+    def cd(self):  # pylint: disable=C0103
+        """Carrier Detect input, wired to the peer's dtr."""
+        return (self._peer or self).dtr
+
+    @property
+    def ri(self):  # pylint: disable=C0103,R0201
+        """Ring Indicator input, which never rings."""
+        return False
+
+    def link(self, peer):
+        """
+        Links this port and peer as a null-modem pair: bytes written to
+        either port are appended to the other's waiting data instead of
+        being answered from `ds_responses`. Both ports must be
+        :class:`ThreadSafeSerial`, or neither.
+        """
+        if (isinstance(self, ThreadSafeSerial) !=
+                isinstance(peer, ThreadSafeSerial)):
+            raise dummyserial.exceptions.DSTypeError(
+                'Cannot link {0!r} to {1!r}: only ports of the same '
+                'thread safety can be linked.'.format(self, peer))
+        self._peer = peer
+        peer._peer = self  # pylint: disable=W0212
+
+    def _enqueue(self, data):
+        """
+        Appends a response to the waiting data.
+
+        Lazy responses (files, callables and iterators) are queued, and
+        their chunks materialized only as they are read. Anything enqueued
+        behind a lazy response waits for it to be exhausted.
+        """
+        if (len(self._rx_sources) >= dummyserial.constants.MAX_HELD_RESPONSES
+                and self.ds_rx_capacity is not None and
+                self.ds_overflow == dummyserial.constants.OVERFLOW_BLOCK):
+            raise dummyserial.exceptions.write_timeout_error()
+        data = _to_bytes(data)
+        delay = 0.0
+        if self.ds_latency is not None:
+            delay = self.ds_latency
+            if callable(delay):
+                delay = delay()
+        if not isinstance(data, _BYTES_TYPES):
+            if isinstance(data, Delayed):
+                delay = data.delay()
+                data = data.response
+                if isinstance(data, _BYTES_TYPES):
+                    data = (data,)
+            if self._rx_sources is _EMPTY:
+                self._rx_sources = collections.deque()
+            self._rx_sources.append([_iter_chunks(data), delay, None])
+            self._materialize(1)
+        elif self._rx_sources:
+            if data:
+                self._rx_sources.append([iter((data,)), delay, None])
+        elif (self.ds_rx_capacity is not None and
+              self.ds_overflow == dummyserial.constants.OVERFLOW_BLOCK and
+              len(self._waiting_data) + len(data) > self.ds_rx_capacity):
+            # Hold off what does not fit until reads make room.
+            self._rx_sources = collections.deque(
+                [[iter((data,)), delay, None]])
+            self._materialize(self.ds_rx_capacity)
+        else:
+            self._append(data, delay)
+
+    def _materialize(self, size):
+        """
+        Pulls chunks from queued lazy responses until size bytes are
+        waiting, or none remain. The latency of a response delays its first
+        chunk. With `ds_rx_capacity`, chunks are split so that no more than
+        the larger of size and the capacity is waiting.
+        """
+        sources = self._rx_sources
+        capacity = self.ds_rx_capacity
+        while sources and len(self._waiting_data) < size:
+            source = sources[0]
+            chunk = source[2]
+            if chunk is None:
+                chunk = next(source[0], None)
+                if chunk is None:
+                    sources.popleft()
+                    continue
+            else:
+                source[2] = None
+            if capacity is not None:
+                room = max(size, capacity) - len(self._waiting_data)
+                if len(chunk) > room:
+                    chunk = memoryview(chunk)
+                    source[2] = chunk[room:]
+                    chunk = chunk[:room]
+            self._append(chunk, source[1], fitted=True)
+            source[1] = 0.0
+
+    def _append(self, data, delay=0.0, fitted=False):
+        """
+        Appends bytes to the waiting data. The data is held back for delay
+        seconds, and behind any data still held back. With `ds_pacing` it
+        is then released at the line's character rate. `ds_impairment` is
+        applied first, then `ds_overflow` if the data does not fit in
+        `ds_rx_capacity`, unless it is a chunk of a lazy response already
+        fitted to the read pulling it.
+        """
+        if self.ds_impairment is not None:
+            data = self.ds_impairment(data)
+        if (self.ds_rx_capacity is not None and not fitted and
+                len(self._waiting_data) + len(data) > self.ds_rx_capacity):
+            data = self._rx_overflow(data)
+        if not data:
+            return
+        self._waiting_data.write(data)
+        if self.ds_pacing or delay > 0 or self._rx_held:
+            start = max(self.ds_clock.time() + delay, self._rx_line_free)
+            if self._rx_schedule is _EMPTY:
+                self._rx_schedule = collections.deque()
+            self._rx_schedule.append([start, len(data)])
+            self._rx_held += len(data)
+            self._rx_line_free = start
+            if self.ds_pacing:
+                self._rx_line_free += len(data) * self.ds_char_time
+
+    def _rx_overflow(self, data):
+        """
+        Applies `ds_overflow` to data which does not fit in the receive
+        FIFO.
+
+        Returns the part of data to append.
+        """
+        waiting = len(self._waiting_data)
+        excess = min(waiting + len(data) - self.ds_rx_capacity, len(data))
+        policy = self.ds_overflow
+        if policy == dummyserial.constants.OVERFLOW_RAISE:
+            raise dummyserial.exceptions.DSOverflowError(
+                'Receive FIFO overflow: {0} bytes over capacity {1}.'.format(
+                    excess, self.ds_rx_capacity))
+        elif policy == dummyserial.constants.OVERFLOW_DROP_NEWEST:
+            data = data[:len(data) - excess]
+        elif policy == dummyserial.constants.OVERFLOW_DROP_OLDEST:
+            self._discard(min(excess, waiting))
+            if excess > waiting:
+                data = data[excess - waiting:]
+        else:
+            # Held off data is split to fit, so only bytes inserted by
+            # ds_impairment get here; the line does not wait for them.
+            return data
+        self.stats.record_rx_overrun(excess)
+        return data
+
+    def _discard(self, size):
+        """Discards the oldest size bytes of waiting data."""
+        released = len(self._waiting_data) - self._rx_held
+        self._waiting_data.discard(size)
+        self._rx_resets += 1
+        size -= released
+        schedule = self._rx_schedule
+        while size > 0:
+            segment = schedule[0]
+            if size >= segment[1]:
+                size -= segment[1]
+                self._rx_held -= segment[1]
+                schedule.popleft()
+            else:
+                segment[1] -= size
+                self._rx_held -= size
+                size = 0
+
+    def _take(self, size):
+        """
+        Consumes size bytes of waiting data. Once the waiting data is
+        exhausted, the next chunk of a lazy response is materialized.
+        """
+        data = self._waiting_data.read(size)
+        if self._rx_sources and not self._waiting_data:
+            self._materialize(1)
+        return data
+
+    def _reset_input(self):
+        """Discards all waiting data, released or not."""
+        self._rx_resets += 1
+        self._rx_sources = _EMPTY
+        self._waiting_data.clear()
+        if self._rx_schedule:
+            self._rx_schedule.clear()
+        self._rx_held = 0
+        self._rx_line_free = 0.0
+
+    def _release(self):
+        """
+        Releases paced data whose transfer time has passed.
+
+        Returns the number of bytes available for reading.
+        """
+        schedule = self._rx_schedule
+        if schedule:
+            now = self.ds_clock.time()
+            char_time = self.ds_char_time if self.ds_pacing else 0.0
+            while schedule:
+                segment = schedule[0]
+                if char_time:
+                    done = int((now - segment[0]) / char_time + 1e-9)
+                elif now >= segment[0]:
+                    done = segment[1]
+                else:
+                    break
+                if done <= 0:
+                    break
+                if done >= segment[1]:
+                    self._rx_held -= segment[1]
+                    schedule.popleft()
+                    continue
+                self._rx_held -= done
+                segment[0] += done * char_time
+                segment[1] -= done
+                break
+        return len(self._waiting_data) - self._rx_held
+
+    def _release_time(self, count):
+        """
+        Returns the device time at which count more bytes will have been
+        released, or `None` if fewer bytes are held back.
+        """
+        char_time = self.ds_char_time if self.ds_pacing else 0.0
+        for start, held in self._rx_schedule:
+            if count <= held:
+                return start + count * char_time
+            count -= held
+        return None
+
+    def _held_wait(self):
+        """
+        Returns the seconds until the segment of held back data being
+        transferred is released, or `None` if no data is held back.
+
+        Used by the drivers which wait on their own event loops in real
+        time: a clock which can be advanced, such as
+        :class:`VirtualClock`, is advanced to the release instead, and 0
+        is returned.
+        """
+        schedule = self._rx_schedule
+        if not schedule:
+            return None
+        clock = self.ds_clock
+        wait = self._release_time(schedule[0][1]) - clock.time()
+        if not hasattr(clock, 'advance'):
+            return max(wait, 0.0)
+        if wait > 0:
+            clock.advance(wait)
+        return 0.0
+
     def write(self, data):
         """
         Write to a port on dummy_serial.
@@ -99,94 +1411,648 @@ class Serial(object):
             dummy_serial. Will affect the response for subsequent read
             operations.
 
-        Note that for Python2, the inputdata should be a **string**. For
-        Python3 it should be of type **bytes**.
+        The data must be of type **bytes**.
         """
-        self._logger.debug('Writing (%s): "%s"', len(data), data)
+        self._debug('Writing (%s): "%s"', len(data), data)
 
         if not self._isOpen:
-            raise portNotOpenError
+            raise dummyserial.exceptions.port_not_open_error()
 
-        if sys.version_info[0] > 2:
-            if not isinstance(data, bytes):
-                raise dummyserial.exceptions.DSTypeError(
-                    'The input must be type bytes. Given:' + repr(data))
-            input_str = str(data, encoding='latin1')
-        else:
-            input_str = data
+        if self.ds_trace is not None:
+            self.ds_trace(TraceRecord(
+                'write', self.port, self.ds_clock.time(), data))
+
+        if not isinstance(data, bytes):
+            raise dummyserial.exceptions.DSTypeError(
+                'The input must be type bytes. Given:' + repr(data))
+
+        if self.ds_pacing:
+            data = self._transmit(data)
+
+        if self._peer is not None:
+            self._peer._enqueue(data)  # pylint: disable=W0212
+            self.stats.record_write(len(data), True)
+            return
+
+        if self._responder is not None:
+            responses = self._responder.respond(data)
+            for response in responses:
+                self._enqueue(response)
+            self.stats.record_write(len(data), responses)
+            return
+
+        if self._matcher is not None:
+            matches, self._match_state = self._matcher.scan(
+                data, self._match_state)
+            for key in matches:
+                self._enqueue(self.ds_responses[key])
+            self.stats.record_write(len(data), matches)
+            return
+
+        if self.ds_framing is not None:
+            self.stats.record_write(len(data), self._write_frames(data))
+            return
 
         # Look up which data that should be waiting for subsequent read
         # commands.
-        self._waiting_data = self.ds_responses.get(
-            input_str, dummyserial.constants.NO_DATA_PRESENT)
+        response = self._lookup(data)
+        self._reset_input()
+        if response is not None:
+            self._enqueue(response)
+        self.stats.record_write(len(data), response is not None)
 
-    def read(self, size=1):
+    def _write_frames(self, data):
         """
-        Read size bytes from the Dummy Serial Responses.
+        Answers the payloads of the frames completed by data with framed
+        responses.
 
-        The response is dependent on what was written last to the port on
-        dummyserial, and what is defined in the :data:`RESPONSES` dictionary.
+        Returns whether any payload was answered.
+        """
+        payloads, self._framing_state = self.ds_framing.decode(
+            data, self._framing_state)
+        matched = False
+        for payload in payloads:
+            response = self._lookup(payload)
+            if response is not None:
+                matched = True
+                self._enqueue(self._frame(response))
+        return matched
 
-        Args:
-            size (int): For compability with the real function.
+    def _tx_backlog(self, now):
+        """Returns the number of written bytes not transmitted by now."""
+        backlog = (self._tx_line_free - now) / self.ds_char_time
+        return max(0, int(math.ceil(backlog - 1e-9)))
+
+    def _transmit(self, data):
+        """
+        Queues data in the paced transmit FIFO, applying `ds_overflow` if it
+        does not fit in `ds_tx_capacity`.
 
-        Returns a **string** for Python2 and **bytes** for Python3.
+        Returns the part of data which is sent.
+        """
+        clock = self.ds_clock
+        char_time = self.ds_char_time
+        now = clock.time()
+        capacity = self.ds_tx_capacity
+        if capacity is not None:
+            backlog = self._tx_backlog(now)
+            excess = backlog + len(data) - capacity
+            policy = self.ds_overflow
+            if excess <= 0:
+                pass
+            elif policy == dummyserial.constants.OVERFLOW_BLOCK:
+                wait = excess * char_time
+                timeout = self.write_timeout
+                if timeout is not None and wait > timeout:
+                    self._sleep_writer(timeout)
+                    raise dummyserial.exceptions.write_timeout_error()
+                self._sleep_writer(wait)
+                now = clock.time()
+            elif policy == dummyserial.constants.OVERFLOW_RAISE:
+                raise dummyserial.exceptions.DSOverflowError(
+                    'Transmit FIFO overflow: {0} bytes over capacity '
+                    '{1}.'.format(excess, capacity))
+            else:
+                if policy == dummyserial.constants.OVERFLOW_DROP_NEWEST:
+                    data = data[:len(data) - excess]
+                else:
+                    dropped = min(excess, backlog)
+                    self._tx_line_free -= dropped * char_time
+                    data = data[excess - dropped:]
+                self.stats.record_tx_overrun(excess)
+        self._tx_line_free = (
+            max(self._tx_line_free, now) + len(data) * char_time)
+        return data
 
-        If the response is shorter than size, it will sleep for timeout.
+    def _sleep_writer(self, seconds):
+        """Blocks a writer waiting for room in the transmit FIFO."""
+        self.ds_clock.sleep(seconds)
 
-        If the response is longer than size, it will return only size bytes.
+    def _frame(self, response):
+        """Returns response framed by `ds_framing`."""
+        response = _to_bytes(response)
+        if isinstance(response, Delayed):
+            return Delayed(self._frame(response.response), response.latency)
+        if not isinstance(response, _BYTES_TYPES):
+            response = b''.join(_iter_chunks(response))
+        return self.ds_framing.encode(response)
+
+    def _lookup(self, data):
+        """
+        Returns the response to data from `ds_responses`, or else from
+        `ds_rules`, or `None`.
         """
-        self._logger.debug('Reading %s bytes.', size)
+        if self._encoded:
+            response = self.ds_responses.get(data)
+        else:
+            response = self.ds_responses.get(str(data, encoding='latin1'))
+
+        if response is None and self.ds_rules is not None:
+            response = self.ds_rules.lookup(data)
+        return response
+
+    def _wait_for(self, size):
+        """
+        Validates a read of size bytes, and sleeps for timeout if fewer
+        bytes are available. With `ds_pacing` the sleep ends as soon as
+        size bytes have been released.
+
+        Returns the number of bytes available to read, or `None` if the
+        waiting data is the :data:`DEFAULT_RESPONSE`, which is returned by
+        reads without being consumed.
+        """
+        self._debug('Reading %s bytes.', size)
 
         if not self._isOpen:
-            raise portNotOpenError
+            raise dummyserial.exceptions.port_not_open_error()
 
         if size < 0:
             raise dummyserial.exceptions.DSIOError(
                 'The size to read must not be negative. ' +
                 'Given: {!r}'.format(size))
 
-        # Do the actual reading from the waiting data, and simulate the
-        # influence of size.
-        if self._waiting_data == dummyserial.constants.DEFAULT_RESPONSE:
-            return_str = self._waiting_data
-        elif size == len(self._waiting_data):
-            return_str = self._waiting_data
-            self._waiting_data = dummyserial.constants.NO_DATA_PRESENT
-        elif size < len(self._waiting_data):
-            self._logger.debug(
+        if self._rx_sources:
+            self._materialize(size)
+        available = self._release()
+        if (available == len(dummyserial.constants.DEFAULT_RESPONSE) and
+                self._waiting_data.peek() == _DEFAULT_RESPONSE):
+            return None
+
+        if size < available:
+            self._debug(
                 'The size (%s) to read is smaller than the available data. ' +
                 'Some bytes will be kept for later. ' +
                 'Available (%s): "%s"',
-                size, len(self._waiting_data), self._waiting_data
+                size, available, self._waiting_data
             )
-
-            return_str = self._waiting_data[:size]
-            self._waiting_data = self._waiting_data[size:]
-        else:  # Wait for timeout - we asked for more data than available!
-            self._logger.debug(
+        elif size > available:
+            # Wait for timeout - we asked for more data than available!
+            self._debug(
                 'The size (%s) to read is larger than the available data. ' +
                 'Will sleep until timeout. ' +
                 'Available (%s): "%s"',
-                size, len(self._waiting_data), self._waiting_data
+                size, available, self._waiting_data
             )
+            if self._wait(size, available, self.timeout) is not None:
+                available = self._release()
+
+        return available
+
+    def _wait(self, size, available, timeout):
+        """
+        Blocks like `_block()`, counting and tracing the time blocked.
+
+        Returns the number of seconds blocked, or `None`.
+        """
+        start = self.ds_clock.time()
+        blocked = self._block(size, available, timeout)
+        if blocked is not None:
+            self.stats.record_timeout(blocked)
+            if self.ds_trace is not None:
+                self.ds_trace(
+                    TraceRecord('timeout', self.port, start, blocked))
+        return blocked
+
+    def _block(self, size, available, timeout):
+        """
+        Waits for timeout, or until paced data makes size bytes available.
+        A timeout of `None` waits only for the data held back, as nothing
+        else can arrive while the port blocks.
+
+        Returns the number of seconds blocked, or `None` if there was
+        nothing to wait for.
+        """
+        if self._rx_held:
+            release_time = self._release_time(size - available)
+            if release_time is None and timeout is None:
+                release_time = self._release_time(self._rx_held)
+            if release_time is not None:
+                wait = release_time - self.ds_clock.time()
+                timeout = wait if timeout is None else min(timeout, wait)
+        if timeout is None:
+            return None
+        self.ds_clock.sleep(timeout)
+        return timeout
+
+    def read(self, size=1):
+        """
+        Read size bytes from the Dummy Serial Responses.
+
+        The response is dependent on what was written last to the port on
+        dummyserial, and what is defined in the :data:`RESPONSES` dictionary.
 
-            time.sleep(self.timeout)
-            return_str = self._waiting_data
-            self._waiting_data = dummyserial.constants.NO_DATA_PRESENT
+        Args:
+            size (int): For compability with the real function.
+
+        Returns **bytes**.
+
+        If the response is shorter than size, it will sleep for timeout on
+        the port's `ds_clock`.
+
+        If the response is longer than size, it will return only size bytes.
+        """
+        available = self._wait_for(size)
+        if available is None:
+            return_data = self._waiting_data.peek()
+        else:
+            return_data = self._take(min(size, available))
+        self.stats.record_read(len(return_data))
 
-        self._logger.debug(
+        self._debug(
             'Read (%s): "%s"',
-            len(return_str), return_str
+            len(return_data), return_data
         )
+        if self.ds_trace is not None:
+            self.ds_trace(TraceRecord(
+                'read', self.port, self.ds_clock.time(), return_data))
 
-        if sys.version_info[0] > 2:  # Convert types to make it python3 compat.
-            return bytes(return_str, encoding='latin1')
-        else:
-            return return_str
+        return return_data
+
+    def readinto(self, buf):
+        """
+        Read up to len(buf) bytes from the Dummy Serial Responses into buf.
+
+        Behaves like `read(len(buf))` without creating intermediate objects.
+
+        Returns the number of bytes read.
+        """
+        available = self._wait_for(len(buf))
+        if available is None:
+            data = self._waiting_data.peek(len(buf))
+            memoryview(buf).cast('B')[:len(data)] = data
+            self.stats.record_read(len(data))
+            return len(data)
+        if available < len(buf):
+            buf = memoryview(buf).cast('B')[:available]
+        size = self._waiting_data.readinto(buf)
+        if self._rx_sources and not self._waiting_data:
+            self._materialize(1)
+        self.stats.record_read(size)
+        self._debug('Read (%s) into buffer.', size)
+        if self.ds_trace is not None:
+            self.ds_trace(TraceRecord(
+                'read', self.port, self.ds_clock.time(),
+                bytes(memoryview(buf).cast('B')[:size])))
+        return size
+
+    def read_all(self):
+        """
+        Read all bytes currently available, without waiting.
+
+        Unlike `read()`, a waiting :data:`DEFAULT_RESPONSE` is consumed.
+        """
+        if not self._isOpen:
+            raise dummyserial.exceptions.port_not_open_error()
+        return_data = self._take(self._release())
+        self.stats.record_read(len(return_data))
+        if self.ds_trace is not None:
+            self.ds_trace(TraceRecord(
+                'read', self.port, self.ds_clock.time(), return_data))
+        return return_data
+
+    def read_until(self, expected=dummyserial.constants.LF, size=None):
+        """
+        Read until expected is found, size bytes are read, or the timeout
+        expires.
+
+        The waiting data is searched in place, resuming from where the
+        previous search stopped, so reading a line costs O(line length).
+
+        Returns **bytes**.
+        """
+        if not self._isOpen:
+            raise dummyserial.exceptions.port_not_open_error()
+
+        clock = self.ds_clock
+        deadline = None
+        if self.timeout is not None:
+            deadline = clock.time() + self.timeout
+        scanned = 0
+        resets = self._rx_resets
+        while True:
+            available = self._release()
+            if resets != self._rx_resets:
+                # The waiting data was replaced while blocked.
+                scanned = 0
+                resets = self._rx_resets
+            end = available if size is None else min(available, size)
+            index = self._waiting_data.find(expected, scanned, end)
+            if index >= 0:
+                end = index + len(expected)
+                break
+            if end == size:
+                break
+            scanned = max(0, end - len(expected) + 1)
+            if self._rx_sources and not self._rx_held:
+                self._materialize(len(self._waiting_data) + 1)
+                continue
+
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - clock.time()
+                if remaining <= 0:
+                    break
+            if self._wait(available + 1, available, remaining) is None:
+                break
+
+        return_data = self._take(end)
+        self.stats.record_read(len(return_data))
+        self._debug('Read (%s): "%s"', len(return_data), return_data)
+        if self.ds_trace is not None:
+            self.ds_trace(TraceRecord(
+                'read', self.port, clock.time(), return_data))
+        return return_data
+
+    def readline(self, size=-1):
+        """
+        Read a line terminated by :data:`LF`, of at most size bytes if size
+        is not negative. See `read_until()`.
+        """
+        return self.read_until(
+            dummyserial.constants.LF, None if size < 0 else size)
+
+    def readlines(self, hint=-1):
+        """Read lines until the timeout expires without a full line."""
+        lines = []
+        total = 0
+        while hint < 0 or total < hint:
+            line = self.readline()
+            if not line:
+                break
+            lines.append(line)
+            total += len(line)
+            if not line.endswith(dummyserial.constants.LF):
+                break
+        return lines
+
+    @property
+    def in_waiting(self):
+        """Number of bytes waiting to be read."""
+        return self._release()
+
+    def inWaiting(self):  # pylint: disable=C0103
+        """Returns length of waiting input data."""
+        return self.in_waiting
 
     def out_waiting(self):  # pylint: disable=C0103
-        """Returns length of waiting output data."""
-        return len(self._waiting_data)
+        """
+        Returns length of waiting output data: with `ds_pacing`, the written
+        bytes not yet transmitted, otherwise always 0.
+        """
+        if not self.ds_pacing:
+            return 0
+        return self._tx_backlog(self.ds_clock.time())
 
     outWaiting = out_waiting  # pyserial 2.7 / 3.0 compat.
+
+    def reset_input_buffer(self):
+        """Discards all waiting input data."""
+        if not self._isOpen:
+            raise dummyserial.exceptions.port_not_open_error()
+        self._reset_input()
+
+    def reset_output_buffer(self):
+        """
+        Discards waiting output data: the paced transmit FIFO, and a partial
+        frame received with `ds_framing`. Writes are answered as they are
+        accepted.
+        """
+        if not self._isOpen:
+            raise dummyserial.exceptions.port_not_open_error()
+        self._framing_state = b''
+        self._tx_line_free = 0.0
+
+    def flush(self):
+        """
+        Waits until all data is written, which with `ds_pacing` takes until
+        the transmit FIFO drains.
+        """
+        if self.ds_pacing:
+            self._sleep_writer(self._tx_line_free - self.ds_clock.time())
+
+    flushInput = reset_input_buffer  # pyserial 2.7 compat.
+    flushOutput = reset_output_buffer  # pyserial 2.7 compat.
+
+
+class ThreadSafeSerial(Serial):
+    """
+    Dummy (mock) serial port which may be shared by reader and writer
+    threads.
+
+    All port state is guarded by a `threading.Condition`. A short `read()`
+    waits on the condition, and is woken as soon as a write (or a peer)
+    makes enough data available, rather than sleeping for the whole
+    timeout. The wait is measured on `ds_clock`; note that a
+    :class:`VirtualClock` advances instead of waiting, so reads there
+    behave as on :class:`Serial`.
+
+    Takes the same arguments as :class:`Serial`.
+    """
+
+    __slots__ = ('_condition',)
+
+    def __init__(self, *args, **kwargs):
+        self._condition = threading.Condition(threading.RLock())
+        super(ThreadSafeSerial, self).__init__(*args, **kwargs)
+
+    def link(self, peer):
+        """
+        Links this port and peer as a null-modem pair, sharing one condition
+        so that writers on both sides never deadlock.
+        """
+        super(ThreadSafeSerial, self).link(peer)
+        peer._condition = self._condition  # pylint: disable=W0212
+
+    def _enqueue(self, data):
+        with self._condition:
+            super(ThreadSafeSerial, self)._enqueue(data)
+            self._condition.notify_all()
+
+    def _block(self, size, available, timeout):
+        clock = self.ds_clock
+        start = clock.time()
+        deadline = None if timeout is None else start + timeout
+        while available < size:
+            wait = None if deadline is None else deadline - clock.time()
+            if wait is not None and wait <= 0:
+                break
+            if self._rx_held:
+                release_time = self._release_time(size - available)
+                if release_time is not None:
+                    release_wait = release_time - clock.time()
+                    wait = release_wait if wait is None else min(
+                        wait, release_wait)
+            clock.wait(self._condition, wait)
+            available = self._release()
+        return clock.time() - start
+
+    def _sleep_writer(self, seconds):
+        clock = self.ds_clock
+        deadline = clock.time() + seconds
+        while True:
+            remaining = deadline - clock.time()
+            if remaining <= 0:
+                break
+            clock.wait(self._condition, remaining)
+
+    def _wait_for_room(self, peer):
+        """
+        Waits until the peer's reader has taken the data held off by its
+        full receive FIFO, or raises after `write_timeout`. Called before
+        writing, so a write which times out is not delivered.
+        """
+        if peer.ds_overflow != dummyserial.constants.OVERFLOW_BLOCK:
+            return
+        clock = self.ds_clock
+        deadline = None
+        if self.write_timeout is not None:
+            deadline = clock.time() + self.write_timeout
+        while peer._rx_sources:  # pylint: disable=W0212
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - clock.time()
+                if remaining <= 0:
+                    raise dummyserial.exceptions.write_timeout_error()
+            clock.wait(self._condition, remaining)
+
+    def _take(self, size):
+        data = super(ThreadSafeSerial, self)._take(size)
+        if self._rx_sources is not _EMPTY:
+            # Wake a linked writer waiting for room.
+            self._condition.notify_all()
+        return data
+
+    def open(self):
+        with self._condition:
+            super(ThreadSafeSerial, self).open()
+
+    def close(self):
+        with self._condition:
+            super(ThreadSafeSerial, self).close()
+            self._condition.notify_all()
+
+    def write(self, data):
+        with self._condition:
+            if self._peer is not None:
+                self._wait_for_room(self._peer)
+            super(ThreadSafeSerial, self).write(data)
+
+    def read(self, size=1):
+        with self._condition:
+            return super(ThreadSafeSerial, self).read(size)
+
+    def readinto(self, buf):
+        with self._condition:
+            size = super(ThreadSafeSerial, self).readinto(buf)
+            if self._rx_sources is not _EMPTY:
+                self._condition.notify_all()
+            return size
+
+    def read_all(self):
+        with self._condition:
+            return super(ThreadSafeSerial, self).read_all()
+
+    def read_until(self, expected=dummyserial.constants.LF, size=None):
+        with self._condition:
+            return super(ThreadSafeSerial, self).read_until(expected, size)
+
+    @property
+    def in_waiting(self):
+        with self._condition:
+            return self._release()
+
+    def out_waiting(self):
+        with self._condition:
+            return super(ThreadSafeSerial, self).out_waiting()
+
+    outWaiting = out_waiting
+
+    def reset_input_buffer(self):
+        with self._condition:
+            super(ThreadSafeSerial, self).reset_input_buffer()
+            self._condition.notify_all()
+
+    def reset_output_buffer(self):
+        with self._condition:
+            super(ThreadSafeSerial, self).reset_output_buffer()
+            self._condition.notify_all()
+
+    def flush(self):
+        with self._condition:
+            super(ThreadSafeSerial, self).flush()
+
+    flushInput = reset_input_buffer
+    flushOutput = reset_output_buffer
+
+
+class PortRegistry(object):
+    """
+    Registry of simulated devices keyed by port name.
+
+    Opening a port name which is already registered returns a handle to the
+    same device, so every part of a test opening eg: '/dev/ttyUSB0' talks
+    to the same simulated device.
+
+    Args:
+        * serial_class: Class of the ports created, eg:
+          :class:`ThreadSafeSerial`. Defaults to :class:`Serial`.
+    """
+
+    def __init__(self, serial_class=None):
+        self.serial_class = serial_class or Serial
+        self._ports = {}
+
+    def __contains__(self, port):
+        return port in self._ports
+
+    def __getitem__(self, port):
+        return self._ports[port]
+
+    def __iter__(self):
+        return iter(self._ports)
+
+    def __len__(self):
+        return len(self._ports)
+
+    def __repr__(self):
+        return '{0}.{1}<{2} ports>'.format(
+            self.__module__, self.__class__.__name__, len(self))
+
+    def open(self, port, **kwargs):
+        """
+        Returns the device registered as port, reopening it if closed, or
+        registers a new device created with kwargs.
+
+        Arguments are ignored when the port is already registered.
+        """
+        serial_instance = self._ports.get(port)
+        if serial_instance is None:
+            serial_instance = self.serial_class(port=port, **kwargs)
+            self._ports[port] = serial_instance
+        elif not serial_instance._isOpen:  # pylint: disable=W0212
+            serial_instance.open()
+        return serial_instance
+
+    def pair(self, port_a, port_b, **kwargs):
+        """
+        Registers two new ports linked as a null-modem pair.
+
+        Returns a tuple of the two ports.
+        """
+        for port in (port_a, port_b):
+            if port in self._ports:
+                raise dummyserial.exceptions.DSIOError(
+                    'Port is already registered: {!r}'.format(port))
+        serial_a = self.open(port_a, **kwargs)
+        serial_b = self.open(port_b, **kwargs)
+        serial_a.link(serial_b)
+        return serial_a, serial_b
+
+    def remove(self, port):
+        """Closes and unregisters port."""
+        self._ports.pop(port).close()
+
+    def clear(self):
+        """Closes and unregisters all ports."""
+        for port in list(self._ports):
+            self.remove(port)
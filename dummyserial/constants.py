@@ -3,15 +3,15 @@
 
 """Dummy Serial Constants."""
 
-import logging
-
 __author__ = 'Greg Albrecht <gba@orionlabs.io>'
 __license__ = 'Apache License, Version 2.0'
 __copyright__ = 'Copyright 2016 Orion Labs, Inc.'
 
 
-LOG_LEVEL = logging.DEBUG
-LOG_FORMAT = logging.Formatter(
+# logging.DEBUG; logging is only imported once debug logging is used, and
+# LOG_FORMAT is built then, by __getattr__ below.
+LOG_LEVEL = 10
+LOG_FORMAT_STRING = (
     '%(asctime)s dummyserial %(levelname)s %(name)s.%(funcName)s:%(lineno)d'
     ' - %(message)s')
 
@@ -21,9 +21,89 @@ DEFAULT_TIMEOUT = 2
 # The default Baud Rate.
 DEFAULT_BAUDRATE = 9600
 
+# The default character framing: 8N1.
+DEFAULT_BYTESIZE = 8
+PARITY_NONE = 'N'
+DEFAULT_PARITY = PARITY_NONE
+DEFAULT_STOPBITS = 1
+
 # Response when no matching message (key) is found in the look-up dictionary.
 # * Should not be an empty string, as that is interpreted as
 #   "no data available on port".
 DEFAULT_RESPONSE = 'NONE'
 
 NO_DATA_PRESENT = ''
+
+# Line terminator of readline().
+LF = b'\n'
+
+# Consumed bytes a ByteBuffer keeps before compacting its storage.
+BUFFER_COMPACT_SIZE = 4096
+
+# Records kept by default in a TraceBuffer.
+TRACE_MAXLEN = 10000
+
+# SerialStats counters, read size (bytes) and blocked time (seconds)
+# histogram bucket bounds.
+STATS_COUNTERS = (
+    'read_calls', 'read_bytes', 'write_calls', 'write_bytes',
+    'matched_writes', 'unmatched_writes', 'timeouts', 'rx_overruns',
+    'tx_overruns')
+STATS_READ_SIZE_BOUNDS = (0, 1, 16, 256, 4096, 65536)
+STATS_BLOCKED_TIME_BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1, 10)
+
+# Bytes read from or written to a pseudo-terminal at once, and seconds
+# between checks for PTYServer.stop().
+PTY_READ_SIZE = 65536
+PTY_POLL_INTERVAL = 0.5
+
+# Lookups kept in the LRU cache of a DiskResponseTable.
+DISK_TABLE_CACHE_SIZE = 4096
+
+# Bytes read at once from file object responses.
+RESPONSE_CHUNK_SIZE = 65536
+
+# Policies for data which does not fit in a bounded FIFO: discard the
+# oldest waiting bytes, discard the incoming bytes (a UART overrun), hold
+# off the writer until there is room, or raise DSOverflowError.
+OVERFLOW_DROP_OLDEST = 'drop-oldest'
+OVERFLOW_DROP_NEWEST = 'drop-newest'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_RAISE = 'raise'
+OVERFLOW_POLICIES = (
+    OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_BLOCK,
+    OVERFLOW_RAISE)
+DEFAULT_OVERFLOW = OVERFLOW_DROP_NEWEST
+
+# Responses held off by a full receive FIFO with the 'block' policy before
+# further writes time out instead, bounding the memory of unread data.
+MAX_HELD_RESPONSES = 256
+
+# Bytes received from or sent to a TCP connection at once, pending
+# connections queued by a listening socket, and seconds between checks for
+# TCPServer.stop().
+TCP_READ_SIZE = 65536
+TCP_BACKLOG = 1024
+TCP_POLL_INTERVAL = 0.5
+
+# SLIP (RFC 1055) and KISS framing bytes: frame end, escape, and the
+# escaped frame end and escape.
+SLIP_END = b'\xc0'
+SLIP_ESC = b'\xdb'
+SLIP_ESC_END = b'\xdc'
+SLIP_ESC_ESC = b'\xdd'
+
+# Smallest (address, function, CRC) and largest Modbus RTU frames in bytes.
+MODBUS_MIN_FRAME = 4
+MODBUS_MAX_FRAME = 256
+
+
+def __getattr__(name):
+    """Builds the LOG_FORMAT `logging.Formatter` on first access."""
+    if name == 'LOG_FORMAT':
+        import logging  # pylint: disable=C0415
+        formatter = logging.Formatter(LOG_FORMAT_STRING)
+        globals()[name] = formatter
+        return formatter
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
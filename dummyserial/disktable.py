@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Disk-Backed Response Tables.
+
+Very large device profiles are kept in an indexed `sqlite3` database rather
+than a dict. Opening a table costs the same however many responses it
+holds, and a bounded LRU cache in front of the database keeps resident
+memory bounded while hot requests are answered from memory.
+"""
+
+import collections
+import sqlite3
+
+from urllib.parse import quote
+
+import dummyserial.classes
+import dummyserial.constants
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+_MISSING = object()
+
+
+class DiskResponseTable(dummyserial.classes.ResponseTable):
+    """
+    Read-only :class:`dummyserial.ResponseTable` stored in a `sqlite3`
+    database, usable wherever `ds_responses` is accepted.
+
+    Args:
+        * path: Path of a database created by `build()`.
+        * cache_size: Number of lookups, hits or misses, kept in the LRU
+          cache.
+    """
+
+    __slots__ = ('path', 'cache_size', '_db', '_cache', '_length')
+
+    def __init__(self, path,
+                 cache_size=dummyserial.constants.DISK_TABLE_CACHE_SIZE):
+        # pylint: disable=W0231
+        self.path = path
+        self.cache_size = cache_size
+        self._db = sqlite3.connect(
+            'file:{0}?mode=ro'.format(quote(path)), uri=True,
+            check_same_thread=False)
+        self._cache = collections.OrderedDict()
+        self._length = None
+        self._matcher = None
+
+    @classmethod
+    def build(cls, path, responses, **kwargs):
+        """
+        Writes responses, a mapping or iterable of (request, response)
+        pairs, to a new database at path.
+
+        Returns the opened table; kwargs are passed to the constructor.
+        """
+        if hasattr(responses, 'items'):
+            responses = responses.items()
+        to_bytes = dummyserial.classes._to_bytes  # pylint: disable=W0212
+        db = sqlite3.connect(path)
+        try:
+            with db:
+                db.execute(
+                    'CREATE TABLE responses ('
+                    'request BLOB PRIMARY KEY, response BLOB NOT NULL'
+                    ') WITHOUT ROWID')
+                db.executemany(
+                    'INSERT OR REPLACE INTO responses VALUES (?, ?)',
+                    ((to_bytes(request), to_bytes(response))
+                     for request, response in responses))
+        finally:
+            db.close()
+        return cls(path, **kwargs)
+
+    def __repr__(self):
+        return '{0}.{1}({2!r})'.format(
+            self.__module__, self.__class__.__name__, self.path)
+
+    def __getitem__(self, request):
+        response = self.get(request, _MISSING)
+        if response is _MISSING:
+            raise KeyError(request)
+        return response
+
+    def __contains__(self, request):
+        return self.get(request, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        for (request,) in self._db.execute(
+                'SELECT request FROM responses'):
+            yield bytes(request)
+
+    def __len__(self):
+        if self._length is None:
+            self._length = self._db.execute(
+                'SELECT COUNT(*) FROM responses').fetchone()[0]
+        return self._length
+
+    def get(self, request, default=None):
+        cache = self._cache
+        try:
+            response = cache[request]
+        except KeyError:
+            row = self._db.execute(
+                'SELECT response FROM responses WHERE request = ?',
+                (request,)).fetchone()
+            response = None if row is None else bytes(row[0])
+            cache[request] = response
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(request)
+        if response is None:
+            return default
+        return response
+
+    def close(self):
+        """Closes the database."""
+        self._db.close()
@@ -1,7 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-"""Dummy Serial Exceptions."""
+"""
+Dummy Serial Exceptions.
+
+pySerial's exceptions are resolved on first use, so importing
+:mod:`dummyserial` does not import :mod:`serial`.
+"""
 
 __author__ = 'Greg Albrecht <gba@orionlabs.io>'
 __license__ = 'Apache License, Version 2.0'
@@ -16,3 +21,41 @@ class DSIOError(IOError):
 class DSTypeError(TypeError):
     """Dummy Serial Wrapper for TypeError Exception."""
     pass
+
+
+class DSOverflowError(DSIOError):
+    """Data did not fit in a bounded FIFO with the 'raise' policy."""
+    pass
+
+
+def _serialutil():
+    """Imports and returns :mod:`serial.serialutil`."""
+    from serial import serialutil  # pylint: disable=C0415
+    return serialutil
+
+
+def serial_exception(message):
+    """Returns a pySerial SerialException with message."""
+    return _serialutil().SerialException(message)
+
+
+def write_timeout_error():
+    """Returns pySerial's exception for a write which timed out."""
+    return _serialutil().SerialTimeoutException('Write timeout')
+
+
+def port_not_open_error():
+    """Returns pySerial's exception for operations on a closed port."""
+    serialutil = _serialutil()
+    error = getattr(serialutil, 'portNotOpenError', None)
+    if error is None:  # pySerial >= 3.5
+        error = serialutil.PortNotOpenError()
+    return error
+
+
+def __getattr__(name):
+    """Resolves SerialException from pySerial on first access."""
+    if name == 'SerialException':
+        return _serialutil().SerialException
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Framing Codecs.
+
+Codecs passed as the `ds_framing` argument of :class:`dummyserial.Serial`
+decode frames out of written bytes, so that `ds_responses` and `ds_rules`
+are keyed by payloads, and frame the responses. Escaping is done with
+`bytes.replace` and CRCs with precomputed 256-entry tables.
+
+Codecs are stateless and may be shared between ports; `decode()` is passed
+and returns the decoding state of the stream, which each port keeps, and
+which is `b''` at the start of a stream.
+"""
+
+import struct
+
+import dummyserial.constants
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+def _crc16_table(poly):
+    """Returns the 256-entry table of a reflected CRC-16 polynomial."""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+_MODBUS_CRC_TABLE = _crc16_table(0xA001)
+
+
+def crc16_modbus(data, crc=0xFFFF):
+    """Returns the Modbus CRC-16 of data, continuing from crc."""
+    table = _MODBUS_CRC_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# Modbus RTU requests by function code: the frame length, and the offset of
+# the byte count adding to it for variable-length requests.
+_MODBUS_REQUESTS = {
+    0x01: (8, None),    # Read Coils
+    0x02: (8, None),    # Read Discrete Inputs
+    0x03: (8, None),    # Read Holding Registers
+    0x04: (8, None),    # Read Input Registers
+    0x05: (8, None),    # Write Single Coil
+    0x06: (8, None),    # Write Single Register
+    0x07: (4, None),    # Read Exception Status
+    0x08: (8, None),    # Diagnostics
+    0x0B: (4, None),    # Get Comm Event Counter
+    0x0C: (4, None),    # Get Comm Event Log
+    0x0F: (9, 6),       # Write Multiple Coils
+    0x10: (9, 6),       # Write Multiple Registers
+    0x11: (4, None),    # Report Server ID
+    0x14: (5, 2),       # Read File Record
+    0x15: (5, 2),       # Write File Record
+    0x16: (10, None),   # Mask Write Register
+    0x17: (13, 10),     # Read/Write Multiple Registers
+    0x18: (6, None),    # Read FIFO Queue
+}
+
+
+def _modbus_request_length(buf, start):
+    """
+    Returns the length of the Modbus RTU request starting at start in buf,
+    or `None` if its function code is unknown. The length of a request
+    whose byte count is not in buf yet is given as the length up to it.
+    """
+    layout = _MODBUS_REQUESTS.get(buf[start + 1])
+    if layout is None:
+        return None
+    length, count = layout
+    if count is not None:
+        if start + count >= len(buf):
+            return count + 1
+        length += buf[start + count]
+    return length
+
+
+def _modbus_crc_matches(buf, start, end):
+    """Returns whether buf[end:end + 2] is the CRC of buf[start:end]."""
+    crc = crc16_modbus(buf[start:end])
+    return buf[end] == crc & 0xFF and buf[end + 1] == crc >> 8
+
+
+def _modbus_frame_end(buf, start, crc, index):
+    """
+    Searches for the CRC ending the Modbus RTU frame starting at start in
+    buf, continuing from index with crc, the CRC of buf[start:index].
+
+    Returns a tuple of the index of the CRC, or `None` if buf holds no
+    complete frame there, and the crc and index to continue from.
+    """
+    table = _MODBUS_CRC_TABLE
+    first = start + dummyserial.constants.MODBUS_MIN_FRAME - 2
+    stop = min(len(buf), start + dummyserial.constants.MODBUS_MAX_FRAME) - 1
+    for index in range(index, stop):
+        if (index >= first and buf[index] == crc & 0xFF and
+                buf[index + 1] == crc >> 8):
+            return index, crc, index
+        crc = (crc >> 8) ^ table[(crc ^ buf[index]) & 0xFF]
+    return None, crc, max(index, stop)
+
+
+def _modbus_resync(buf, start):
+    """
+    Searches buf from start for a complete request with a known function
+    code and a matching CRC.
+
+    Returns a tuple of its index, or `None`, and the index to continue the
+    search from: the first request which is not complete yet.
+    """
+    max_frame = dummyserial.constants.MODBUS_MAX_FRAME
+    stop = len(buf) - dummyserial.constants.MODBUS_MIN_FRAME + 1
+    for index in range(start, stop):
+        length = _modbus_request_length(buf, index)
+        if length is None or length > max_frame:
+            continue
+        if len(buf) - index < length:
+            return None, index
+        if _modbus_crc_matches(buf, index, index + length - 2):
+            return index, index
+    return None, max(start, stop)
+
+
+class SLIPCodec(object):
+    """
+    SLIP (RFC 1055) framing: payloads are escaped and terminated by
+    :data:`SLIP_END`. Empty frames, as sent to flush line noise, are
+    skipped.
+    """
+
+    __slots__ = ()
+
+    end = dummyserial.constants.SLIP_END
+    esc = dummyserial.constants.SLIP_ESC
+    esc_end = esc + dummyserial.constants.SLIP_ESC_END
+    esc_esc = esc + dummyserial.constants.SLIP_ESC_ESC
+
+    def __repr__(self):
+        return '{0}.{1}()'.format(self.__module__, self.__class__.__name__)
+
+    def escape(self, payload):
+        """Escapes the frame end and escape bytes of payload."""
+        if self.esc in payload:
+            payload = payload.replace(self.esc, self.esc_esc)
+        if self.end in payload:
+            payload = payload.replace(self.end, self.esc_end)
+        return payload
+
+    def unescape(self, frame):
+        """Reverses `escape()`."""
+        if self.esc in frame:
+            frame = frame.replace(self.esc_end, self.end).replace(
+                self.esc_esc, self.esc)
+        return frame
+
+    def encode(self, payload):
+        """Returns the frame carrying payload."""
+        return self.end + self.escape(payload) + self.end
+
+    def decode(self, data, state=b''):
+        """
+        Decodes the frames completed by data, following the undecoded
+        state returned by the previous call.
+
+        Returns a tuple of the list of payloads and the new state.
+        """
+        frames = (state + data).split(self.end)
+        state = frames.pop()
+        return [self.unescape(frame) for frame in frames if frame], state
+
+
+class KISSCodec(SLIPCodec):
+    """
+    KISS TNC framing: SLIP framing of a command byte and payload. Only data
+    frames for the codec's TNC port are decoded; parameter commands such as
+    TXDELAY are ignored. Responses are sent as data frames on that port.
+
+    Args:
+        * port: TNC port number, 0-15.
+    """
+
+    __slots__ = ('port', '_command')
+
+    def __init__(self, port=0):
+        self.port = port
+        self._command = struct.pack('B', port << 4)
+
+    def __repr__(self):
+        return '{0}.{1}(port={2!r})'.format(
+            self.__module__, self.__class__.__name__, self.port)
+
+    def encode(self, payload):
+        return self.end + self._command + self.escape(payload) + self.end
+
+    def decode(self, data, state=b''):
+        frames, state = super(KISSCodec, self).decode(data, state)
+        command = self._command
+        return [
+            frame[1:] for frame in frames if frame[:1] == command], state
+
+
+class ModbusRTUCodec(object):
+    """
+    Modbus RTU framing: payloads (address, function code and data) are
+    followed by their little-endian CRC-16.
+
+    RTU frames are delimited by line silence rather than by a byte, so the
+    length of a request is read from its function code and byte count, and
+    its CRC checked. For unknown function codes a frame ends where the CRC
+    of the bytes before it matches; as on a real line, a long frame or run
+    of noise may then contain a chance CRC match and decode early. Bytes
+    which do not start a frame are skipped once they fail the CRC, once a
+    later request with a known function code is complete, or once
+    :data:`MODBUS_MAX_FRAME` bytes follow them.
+
+    The decoding state is a tuple of the undecoded bytes and the progress
+    of the search over them, so partial frames are not scanned again.
+    """
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return '{0}.{1}()'.format(self.__module__, self.__class__.__name__)
+
+    def encode(self, payload):  # pylint: disable=R0201
+        """Returns the frame carrying payload."""
+        return payload + struct.pack('<H', crc16_modbus(payload))
+
+    def decode(self, data, state=b''):  # pylint: disable=R0201
+        """
+        Decodes the frames completed by data, following the undecoded
+        state returned by the previous call.
+
+        Returns a tuple of the list of payloads and the new state.
+        """
+        if state:
+            buf, crc, index, resync = state
+            buf += data
+        else:
+            buf, crc, index, resync = bytes(data), 0xFFFF, 0, 1
+        payloads = []
+        start = 0
+        while len(buf) - start >= dummyserial.constants.MODBUS_MIN_FRAME:
+            length = _modbus_request_length(buf, start)
+            if length is None:
+                end, crc, index = _modbus_frame_end(buf, start, crc, index)
+                possible = (
+                    end is not None or len(buf) - start <
+                    dummyserial.constants.MODBUS_MAX_FRAME)
+            elif length > dummyserial.constants.MODBUS_MAX_FRAME:
+                end, possible = None, False
+            elif len(buf) - start < length:
+                break
+            else:
+                end = start + length - 2
+                if not _modbus_crc_matches(buf, start, end):
+                    end, possible = None, False
+
+            if end is not None:
+                payloads.append(buf[start:end])
+                start = end + 2
+            elif not possible:
+                start += 1
+            else:
+                # Waits for the rest of a frame with an unknown function
+                # code, unless a known request follows it.
+                later, resync = _modbus_resync(buf, max(resync, start + 1))
+                if later is None:
+                    break
+                start = later
+            crc, index, resync = 0xFFFF, start, max(resync, start + 1)
+
+        if start == len(buf):
+            return payloads, b''
+        return payloads, (buf[start:], crc, index - start, resync - start)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Pseudo-Terminal Server.
+
+Exposes simulated devices as real pseudo-terminals, so programs which open
+`/dev/tty*` paths directly can talk to them. Each device is answered by a
+:class:`dummyserial.Serial` port, and all devices are driven from a single
+`selectors` (epoll on Linux) loop.
+"""
+
+import errno
+import logging
+import os
+import selectors
+import tty
+
+import dummyserial.constants
+import dummyserial.exceptions
+import dummyserial.selectorserver
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class PTYDevice(dummyserial.selectorserver.SelectorChannel):
+    """
+    A simulated device served on a pseudo-terminal.
+
+    Args:
+        * serial_instance: The :class:`dummyserial.Serial` answering writes.
+        * master: File descriptor of the pseudo-terminal master.
+        * slave: File descriptor of the pseudo-terminal slave, held open so
+          clients may close and reopen the device.
+        * link: Path of the symlink to the slave, or `None`.
+    """
+
+    __slots__ = ('master', 'slave', 'link')
+
+    def __init__(self, serial_instance, master, slave, link=None):
+        super(PTYDevice, self).__init__(serial_instance)
+        self.master = master
+        self.slave = slave
+        self.link = link
+
+    def __repr__(self):
+        return '{0}.{1}(port={2!r}, tty={3!r})'.format(
+            self.__module__, self.__class__.__name__, self.serial.port,
+            self.tty_name)
+
+    @property
+    def tty_name(self):
+        """Path of the pseudo-terminal slave, eg: '/dev/pts/3'."""
+        return os.ttyname(self.slave)
+
+
+class PTYServer(dummyserial.selectorserver.SelectorServer):
+    """
+    Serves any number of simulated devices on pseudo-terminals from one
+    `selectors` loop.
+
+    Args:
+        * serial_class: Class of the ports answering writes. Defaults to
+          :class:`dummyserial.Serial`.
+    """
+
+    _logger = logging.getLogger(__name__)
+
+    _chunk_size = dummyserial.constants.PTY_READ_SIZE
+    _poll_interval = dummyserial.constants.PTY_POLL_INTERVAL
+
+    def add_device(self, port, **kwargs):
+        """
+        Creates a pseudo-terminal answered by a port created with kwargs,
+        and symlinks port to it. An existing symlink at port is replaced.
+
+        Returns the :class:`PTYDevice`.
+        """
+        if port in self.devices:
+            raise dummyserial.exceptions.DSIOError(
+                'Device is already served: {!r}'.format(port))
+
+        kwargs.setdefault('ds_debug', False)
+        serial_instance = self.serial_class(port=port, **kwargs)
+
+        master, slave = os.openpty()
+        try:
+            tty.setraw(slave)
+            os.set_blocking(master, False)
+            if os.path.islink(port):
+                os.remove(port)
+            os.symlink(os.ttyname(slave), port)
+        except OSError:
+            os.close(master)
+            os.close(slave)
+            raise
+
+        device = PTYDevice(serial_instance, master, slave, port)
+        self.devices[port] = device
+        self._selector.register(master, selectors.EVENT_READ, device)
+        self._logger.debug('Serving %r', device)
+        return device
+
+    def remove_device(self, port):
+        """Stops serving port, and removes its symlink."""
+        device = self.devices.pop(port)
+        self._selector.unregister(device.master)
+        os.close(device.master)
+        os.close(device.slave)
+        device.master = None
+        if device.link and os.path.islink(device.link):
+            os.remove(device.link)
+        device.serial.close()
+
+    def close(self):
+        """Stops serving all devices."""
+        for port in list(self.devices):
+            self.remove_device(port)
+        super(PTYServer, self).close()
+
+    def _fileobj(self, device):
+        return device.master
+
+    def _handle_read(self, device):
+        try:
+            data = os.read(device.master, dummyserial.constants.PTY_READ_SIZE)
+        except OSError as exc:
+            # EIO: the slave has no open descriptors left.
+            if exc.errno in (errno.EAGAIN, errno.EIO):
+                return
+            raise
+        if data:
+            device.serial.write(data)
+            self._answer(device)
+
+    def _send(self, device, data):
+        try:
+            return os.write(device.master, data)
+        except OSError as exc:
+            if exc.errno != errno.EAGAIN:
+                raise
+            return None
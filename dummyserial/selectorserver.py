@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Selector Server.
+
+Base of the servers which expose simulated devices to other processes,
+eg: :class:`dummyserial.ptyserver.PTYServer` and
+:class:`dummyserial.tcpserver.TCPServer`. All of a server's channels are
+driven from a single non-blocking `selectors` (epoll on Linux) loop, with a
+heap of timers releasing paced responses.
+"""
+
+import heapq
+import logging
+import selectors
+import time
+
+import dummyserial.classes
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class SelectorChannel(object):
+    """
+    A stream answered by a :class:`dummyserial.Serial` port.
+
+    Args:
+        * serial_instance: The :class:`dummyserial.Serial` answering writes.
+    """
+
+    __slots__ = ('serial', 'pending', 'writing', 'due')
+
+    def __init__(self, serial_instance):
+        self.serial = serial_instance
+        self.pending = dummyserial.classes.ByteBuffer()
+        self.writing = False
+        self.due = None
+
+
+class SelectorServer(object):
+    """
+    Serves :class:`SelectorChannel` objects from one `selectors` loop.
+
+    Subclasses register their channels with `_selector`, and implement
+    `_fileobj()`, `_handle_read()` and `_send()`.
+
+    Args:
+        * serial_class: Class of the ports answering writes. Defaults to
+          :class:`dummyserial.Serial`.
+    """
+
+    _logger = logging.getLogger(__name__)
+
+    # Bytes sent to a channel at once, and the default seconds between
+    # checks for stop(), set by subclasses from dummyserial.constants.
+    _chunk_size = None
+    _poll_interval = None
+
+    def __init__(self, serial_class=None):
+        self.serial_class = serial_class or dummyserial.classes.Serial
+        self.devices = {}
+        self._selector = selectors.DefaultSelector()
+        self._timers = []
+        self._running = False
+
+    def __repr__(self):
+        return '{0}.{1}<{2} devices>'.format(
+            self.__module__, self.__class__.__name__, len(self.devices))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stops serving all devices."""
+        self._selector.close()
+
+    def run_once(self, timeout=None):
+        """
+        Waits at most timeout seconds for activity or paced responses, and
+        handles it.
+        """
+        if self._timers:
+            wait = self._timers[0][0] - time.monotonic()
+            timeout = wait if timeout is None else min(timeout, wait)
+            timeout = max(timeout, 0)
+
+        for key, events in self._selector.select(timeout):
+            self._handle_event(key.data, events)
+
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            _, _, channel = heapq.heappop(self._timers)
+            channel.due = None
+            if self._fileobj(channel) is not None:
+                self._answer(channel)
+
+    def serve_forever(self, poll_interval=None):
+        """Handles activity until `stop()` is called."""
+        if poll_interval is None:
+            poll_interval = self._poll_interval
+        self._running = True
+        while self._running:
+            self.run_once(poll_interval)
+
+    def stop(self):
+        """Stops `serve_forever()`."""
+        self._running = False
+
+    def _fileobj(self, channel):
+        """
+        Returns the file object channel is registered with, or `None` once
+        it is closed.
+        """
+        raise NotImplementedError
+
+    def _handle_event(self, channel, events):
+        """Handles the selector events of channel."""
+        if events & selectors.EVENT_READ:
+            self._handle_read(channel)
+        if (events & selectors.EVENT_WRITE and
+                self._fileobj(channel) is not None):
+            self._flush(channel)
+
+    def _handle_read(self, channel):
+        """Reads from channel and writes the data to its port."""
+        raise NotImplementedError
+
+    def _send(self, channel, data):
+        """
+        Sends data to channel, returning the number of bytes sent, or
+        `None` if it would block or the channel was closed.
+        """
+        raise NotImplementedError
+
+    def _queue(self, channel, data):
+        """Queues response data for channel."""
+        channel.pending.write(data)
+
+    def _answer(self, channel):
+        """Moves the port's available response to the channel."""
+        response = channel.serial.read_all()
+        if response:
+            self._queue(channel, response)
+        self._flush(channel)
+
+        # Paced data still held back is answered once the segment being
+        # transferred has been released, by at most one timer per channel.
+        if channel.due is None and self._fileobj(channel) is not None:
+            wait = channel.serial._held_wait()  # pylint: disable=W0212
+            if wait is not None:
+                channel.due = time.monotonic() + wait
+                heapq.heappush(
+                    self._timers, (channel.due, id(channel), channel))
+
+    def _flush(self, channel):
+        """Sends pending data, waiting for EVENT_WRITE if it blocks."""
+        pending = channel.pending
+        while True:
+            if not pending:
+                # Pull further chunks of lazy responses only as fast as the
+                # channel accepts them.
+                if not channel.serial.in_waiting:
+                    break
+                self._queue(channel, channel.serial.read_all())
+            sent = self._send(channel, pending.peek(self._chunk_size))
+            if sent is None:
+                break
+            pending.read(sent)
+
+        fileobj = self._fileobj(channel)
+        writing = bool(pending)
+        if fileobj is not None and writing != channel.writing:
+            events = selectors.EVENT_READ
+            if writing:
+                events |= selectors.EVENT_WRITE
+            self._selector.modify(fileobj, events, channel)
+            channel.writing = writing
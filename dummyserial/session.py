@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial Stateful Sessions.
+
+A session script describes a device whose answers depend on its state, eg:
+login, then a menu, then data mode::
+
+    {
+        "initial": "login",
+        "states": {
+            "login": [
+                {"request": "admin\\r", "response": "> ", "next": "menu"}
+            ],
+            "menu": [
+                {"request": "read\\r", "response": ["1\\r", "2\\r", "3\\r"]},
+                {"request": "quit\\r", "response": "bye\\r",
+                 "next": "login"},
+                {"unmatched": true, "response": "?\\r"}
+            ]
+        }
+    }
+
+Each state lists its transitions: the exact request written, the response
+(or a list of responses, served in turn), and the next state (default: stay
+in the current state). An "unmatched" transition answers any other write.
+Scripts may be dicts, or JSON or YAML (with PyYAML installed) files.
+
+The script is compiled into a transition table indexed by (state, request),
+so a :class:`Session` advances in constant time per write however large
+the script.
+"""
+
+import json
+
+import dummyserial.classes
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class SessionScript(object):
+    """
+    Compiled, immutable session script, which may be shared by any number
+    of :class:`Session` cursors.
+
+    Args:
+        * script: The session script dict.
+    """
+
+    def __init__(self, script):
+        to_bytes = dummyserial.classes._to_bytes  # pylint: disable=W0212
+        try:
+            states = script['states']
+            self.states = list(states)
+            self.initial = self.states.index(
+                script.get('initial', self.states[0]))
+        except (KeyError, IndexError, ValueError) as exc:
+            raise dummyserial.exceptions.DSTypeError(
+                'Invalid session script: {!r}'.format(exc))
+
+        state_ids = dict((name, number)
+                         for number, name in enumerate(self.states))
+
+        # (state, request) -> (responses, next state). Requests of None
+        # are the unmatched transitions.
+        self.transitions = {}
+        for name, transitions in states.items():
+            state = state_ids[name]
+            for transition in transitions:
+                next_state = transition.get('next', name)
+                if next_state not in state_ids:
+                    raise dummyserial.exceptions.DSTypeError(
+                        'Unknown next state {!r} in state {!r}'.format(
+                            next_state, name))
+                responses = transition.get('response', ())
+                if not isinstance(responses, (list, tuple)):
+                    responses = (responses,)
+                if transition.get('unmatched'):
+                    request = None
+                else:
+                    request = to_bytes(transition['request'])
+                self.transitions[(state, request)] = (
+                    tuple(to_bytes(response) for response in responses),
+                    state_ids[next_state])
+
+    def __repr__(self):
+        return '{0}.{1}<{2} states, {3} transitions>'.format(
+            self.__module__, self.__class__.__name__, len(self.states),
+            len(self.transitions))
+
+    @classmethod
+    def load(cls, path):
+        """Compiles the JSON, or YAML (.yaml, .yml), script at path."""
+        with open(path) as script_file:
+            if path.endswith(('.yaml', '.yml')):
+                import yaml  # pylint: disable=C0415
+                return cls(yaml.safe_load(script_file))
+            return cls(json.load(script_file))
+
+
+class Session(object):
+    """
+    Cursor through a :class:`SessionScript`, for use as `ds_session`.
+
+    Args:
+        * script: The :class:`SessionScript`, or a script dict.
+        * state: Name of the state to start in. Defaults to the script's
+          initial state.
+    """
+
+    def __init__(self, script, state=None):
+        if not isinstance(script, SessionScript):
+            script = SessionScript(script)
+        self.script = script
+        self._state = script.initial
+        # Number of times each transition with several responses was taken.
+        self._counts = {}
+        if state is not None:
+            self.state = state
+
+    def __repr__(self):
+        return '{0}.{1}(state={2!r})'.format(
+            self.__module__, self.__class__.__name__, self.state)
+
+    @property
+    def state(self):
+        """Name of the current state."""
+        return self.script.states[self._state]
+
+    @state.setter
+    def state(self, name):
+        self._state = self.script.states.index(name)
+
+    def reset(self):
+        """Returns to the initial state and restarts response lists."""
+        self._state = self.script.initial
+        self._counts.clear()
+
+    def respond(self, data):
+        """
+        Takes the transition for the write data from the current state.
+
+        Returns the list of responses.
+        """
+        transitions = self.script.transitions
+        key = (self._state, data)
+        transition = transitions.get(key)
+        if transition is None:
+            key = (self._state, None)
+            transition = transitions.get(key)
+            if transition is None:
+                return []
+
+        responses, self._state = transition
+        if len(responses) > 1:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            return [responses[count % len(responses)]]
+        return list(responses)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Dummy Serial TCP Server.
+
+Exposes simulated devices on TCP ports, so clients in other processes or
+containers can open them with pySerial's `socket://` (raw) or
+`rfc2217://` URLs. Every accepted connection is answered by its own
+:class:`dummyserial.Serial` port, and all listening sockets and connections
+are driven from a single non-blocking `selectors` (epoll on Linux) loop.
+"""
+
+import errno
+import logging
+import selectors
+import socket
+
+import serial.rfc2217
+
+import dummyserial.constants
+import dummyserial.exceptions
+import dummyserial.selectorserver
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+PROTOCOLS = ('raw', 'rfc2217')
+
+
+def _unescape(manager, data):
+    """
+    Passes received data through the Telnet / RFC 2217 state machine of
+    manager, handing only the data before the first IAC to it when nothing
+    is being negotiated.
+    """
+    if manager.mode == serial.rfc2217.M_NORMAL and manager.suboption is None:
+        index = data.find(serial.rfc2217.IAC)
+        if index < 0:
+            return data
+        return data[:index] + b''.join(manager.filter(data[index:]))
+    return b''.join(manager.filter(data))
+
+
+class TCPDevice(object):
+    """
+    A simulated device profile served on a listening TCP socket.
+
+    Args:
+        * listener: The listening socket.
+        * protocol: 'raw' or 'rfc2217'.
+        * kwargs: Arguments of the port created for each connection.
+    """
+
+    __slots__ = ('listener', 'protocol', 'kwargs', 'connections')
+
+    def __init__(self, listener, protocol, kwargs):
+        self.listener = listener
+        self.protocol = protocol
+        self.kwargs = kwargs
+        self.connections = set()
+
+    def __repr__(self):
+        return (
+            '{0}.{1}(address={2!r}, protocol={3!r}, connections={4})'.format(
+                self.__module__, self.__class__.__name__, self.address,
+                self.protocol, len(self.connections)))
+
+    @property
+    def address(self):
+        """The (host, port) the device listens on."""
+        return self.listener.getsockname()[:2]
+
+
+class TCPConnection(dummyserial.selectorserver.SelectorChannel):
+    """
+    A client connection to a :class:`TCPDevice`.
+
+    Args:
+        * device: The :class:`TCPDevice` accepting the connection.
+        * sock: The connected socket.
+        * serial_instance: The :class:`dummyserial.Serial` answering writes.
+    """
+
+    __slots__ = ('device', 'sock', 'manager')
+
+    def __init__(self, device, sock, serial_instance):
+        super(TCPConnection, self).__init__(serial_instance)
+        self.device = device
+        self.sock = sock
+        self.manager = None
+        if device.protocol == 'rfc2217':
+            # Sends the initial Telnet / RFC 2217 option requests.
+            self.manager = serial.rfc2217.PortManager(serial_instance, self)
+
+    def __repr__(self):
+        return '{0}.{1}(port={2!r})'.format(
+            self.__module__, self.__class__.__name__, self.serial.port)
+
+    def write(self, data):
+        """
+        Queues data for the client. Used by the RFC 2217 port manager for
+        negotiation replies.
+        """
+        self.pending.write(data)
+
+
+class TCPServer(dummyserial.selectorserver.SelectorServer):
+    """
+    Serves any number of simulated devices, and any number of connections to
+    each, on TCP ports from one `selectors` loop.
+
+    Args:
+        * serial_class: Class of the ports answering writes. Defaults to
+          :class:`dummyserial.Serial`.
+    """
+
+    _logger = logging.getLogger(__name__)
+
+    _chunk_size = dummyserial.constants.TCP_READ_SIZE
+    _poll_interval = dummyserial.constants.TCP_POLL_INTERVAL
+
+    def __init__(self, serial_class=None):
+        super(TCPServer, self).__init__(serial_class)
+        # Devices whose listeners stopped accepting for want of descriptors.
+        self._paused = set()
+
+    def add_device(self, address=('127.0.0.1', 0), protocol='raw', **kwargs):
+        """
+        Listens on address, a (host, port) tuple, answering each connection
+        with a port created with kwargs. Port 0 picks a free port.
+
+        Returns the :class:`TCPDevice`, keyed in `devices` by its address.
+        """
+        if protocol not in PROTOCOLS:
+            raise dummyserial.exceptions.DSIOError(
+                'Unknown protocol: {!r}'.format(protocol))
+
+        kwargs.setdefault('ds_debug', False)
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            listener.bind(address)
+            listener.listen(dummyserial.constants.TCP_BACKLOG)
+        except socket.error:
+            listener.close()
+            raise
+        listener.setblocking(False)
+
+        device = TCPDevice(listener, protocol, kwargs)
+        self.devices[device.address] = device
+        self._selector.register(listener, selectors.EVENT_READ, device)
+        self._logger.debug('Serving %r', device)
+        return device
+
+    def remove_device(self, address):
+        """Stops serving the device at address, closing its connections."""
+        device = self.devices.pop(tuple(address))
+        if device in self._paused:
+            self._paused.discard(device)
+        else:
+            self._selector.unregister(device.listener)
+        for connection in list(device.connections):
+            self._close(connection)
+        device.listener.close()
+
+    def close(self):
+        """Stops serving all devices."""
+        for address in list(self.devices):
+            self.remove_device(address)
+        super(TCPServer, self).close()
+
+    def _fileobj(self, connection):
+        return connection.sock
+
+    def _handle_event(self, target, events):
+        if isinstance(target, TCPDevice):
+            self._accept(target)
+        else:
+            super(TCPServer, self)._handle_event(target, events)
+
+    def _accept(self, device):
+        """Accepts every pending connection to device."""
+        while True:
+            try:
+                sock, peer = device.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as exc:
+                if exc.errno not in (errno.EMFILE, errno.ENFILE):
+                    raise
+                # The pending connection keeps the listener readable, so
+                # stop watching it until a connection frees a descriptor.
+                self._logger.warning('Not accepting on %r: %s', device, exc)
+                self._selector.unregister(device.listener)
+                self._paused.add(device)
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            serial_instance = self.serial_class(
+                port='{0}:{1}'.format(*peer[:2]), **device.kwargs)
+            connection = TCPConnection(device, sock, serial_instance)
+            device.connections.add(connection)
+            self._selector.register(sock, selectors.EVENT_READ, connection)
+            self._logger.debug('Accepted %r', connection)
+            if connection.pending:
+                self._flush(connection)
+
+    def _close(self, connection):
+        """Closes connection and its port."""
+        if connection.sock is None:
+            return
+        self._logger.debug('Closing %r', connection)
+        connection.device.connections.discard(connection)
+        self._selector.unregister(connection.sock)
+        connection.sock.close()
+        connection.sock = None
+        connection.serial.close()
+
+        for device in self._paused:
+            self._logger.debug('Accepting on %r', device)
+            self._selector.register(
+                device.listener, selectors.EVENT_READ, device)
+        self._paused.clear()
+
+    def _handle_read(self, connection):
+        try:
+            data = connection.sock.recv(dummyserial.constants.TCP_READ_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except (ConnectionResetError, ConnectionAbortedError):
+            data = b''
+        if not data:
+            self._close(connection)
+            return
+        if connection.manager is not None:
+            data = _unescape(connection.manager, data)
+        if data:
+            connection.serial.write(data)
+        self._answer(connection)
+
+    def _queue(self, connection, data):
+        """Queues response data, escaping IAC bytes for RFC 2217."""
+        if connection.manager is not None:
+            data = data.replace(
+                serial.rfc2217.IAC, serial.rfc2217.IAC_DOUBLED)
+        connection.pending.write(data)
+
+    def _send(self, connection, data):
+        try:
+            return connection.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            return None
+        except socket.error as exc:
+            if exc.errno not in (errno.EPIPE, errno.ECONNRESET):
+                raise
+            self._close(connection)
+            return None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial asyncio Transport."""
+
+import asyncio
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.aio
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class SerialTransportTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial asyncio Transport."""
+
+    def test_open_serial_connection(self):
+        """Tests writing-to and reading-from asyncio streams."""
+        async def exchange():
+            reader, writer = await dummyserial.aio.open_serial_connection(
+                port='/dev/ttyAIO',
+                ds_responses={'taco': 'yum\n'},
+                ds_debug=False
+            )
+            writer.write(b'taco')
+            line = await reader.readline()
+            writer.close()
+            return line
+
+        self.assertEqual(b'yum\n', asyncio.run(exchange()))
+
+    def test_pyserial_arguments(self):
+        """Tests pySerial-asyncio's positional and url= call forms."""
+        async def exchange():
+            loop = asyncio.get_running_loop()
+            transport, _ = await dummyserial.aio.create_serial_connection(
+                loop, asyncio.Protocol, '/dev/ttyAIO', 19200,
+                ds_debug=False)
+            self.assertEqual('/dev/ttyAIO', transport.serial.port)
+            self.assertEqual(19200, transport.serial.baudrate)
+            transport.close()
+
+            reader, writer = await dummyserial.aio.open_serial_connection(
+                url='/dev/ttyURL', baudrate=115200,
+                ds_responses={'taco': 'yum\n'}, ds_debug=False)
+            self.assertEqual(
+                '/dev/ttyURL', writer.get_extra_info('serial').port)
+            writer.write(b'taco')
+            line = await reader.readline()
+            writer.close()
+            return line
+
+        self.assertEqual(b'yum\n', asyncio.run(exchange()))
+
+    def test_protocol(self):
+        """Tests protocol callbacks of a Serial Transport."""
+        events = []
+
+        class Protocol(asyncio.Protocol):
+            """Records callbacks."""
+
+            def connection_made(self, transport):
+                events.append('made')
+
+            def data_received(self, data):
+                events.append(data)
+
+            def connection_lost(self, exc):
+                events.append('lost')
+
+        async def exchange():
+            loop = asyncio.get_running_loop()
+            transport, _ = await dummyserial.aio.create_serial_connection(
+                loop, Protocol, port='/dev/ttyAIO',
+                ds_responses={'taco': 'yum'}, ds_debug=False)
+            self.assertIsInstance(
+                transport.get_extra_info('serial'), dummyserial.Serial)
+            transport.pause_reading()
+            transport.write(b'taco')
+            await asyncio.sleep(0)
+            self.assertEqual(['made'], events)
+            transport.resume_reading()
+            await asyncio.sleep(0)
+            transport.close()
+            await asyncio.sleep(0)
+
+        asyncio.run(exchange())
+        self.assertEqual(['made', b'yum', 'lost'], events)
+
+    def test_lazy_response(self):
+        """Tests streaming a lazy response through asyncio streams."""
+        def dump():
+            for _ in range(1000):
+                yield b'x' * 1023 + b'\n'
+
+        async def exchange():
+            reader, writer = await dummyserial.aio.open_serial_connection(
+                port='/dev/ttyAIO',
+                ds_responses={'dump': dump()},
+                ds_debug=False
+            )
+            writer.write(b'dump')
+            total = 0
+            for _ in range(1000):
+                total += len(await reader.readline())
+            writer.close()
+            return total
+
+        self.assertEqual(1024 * 1000, asyncio.run(exchange()))
+
+    def test_virtual_latency(self):
+        """Tests latency on a virtual clock is delivered without waiting."""
+        clock = dummyserial.VirtualClock()
+
+        async def exchange():
+            reader, writer = await dummyserial.aio.open_serial_connection(
+                port='/dev/ttyAIO',
+                ds_responses={'taco': 'yum\n'},
+                ds_latency=30,
+                ds_clock=clock,
+                ds_debug=False
+            )
+            writer.write(b'taco')
+            line = await asyncio.wait_for(reader.readline(), 5)
+            writer.close()
+            return line
+
+        self.assertEqual(b'yum\n', asyncio.run(exchange()))
+        self.assertEqual(30, clock.elapsed)
+
+    def test_many_ports(self):
+        """Tests many paced ports sharing one event loop."""
+        async def exchange(number):
+            reader, writer = await dummyserial.aio.open_serial_connection(
+                port='/dev/ttyAIO{0}'.format(number),
+                baudrate=115200,
+                ds_responses={'ping': 'pong {0}\n'.format(number)},
+                ds_pacing=True,
+                ds_debug=False
+            )
+            writer.write(b'ping')
+            line = await reader.readline()
+            writer.close()
+            return line
+
+        async def exchange_all():
+            return await asyncio.gather(
+                *[exchange(number) for number in range(500)])
+
+        lines = asyncio.run(exchange_all())
+        self.assertEqual(
+            ['pong {0}\n'.format(number).encode() for number in range(500)],
+            lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Benchmarks."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.bench
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class BenchTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Benchmarks."""
+
+    def setUp(self):  # pylint: disable=C0103
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_run(self):
+        """Tests running every benchmark at a tiny scale."""
+        results = dummyserial.bench.run(scale=0.001, repeat=1)
+        self.assertEqual(
+            [func.__name__ for func in dummyserial.bench.BENCHMARKS],
+            [result['name'] for result in results])
+        for result in results:
+            self.assertGreater(result['ops_per_sec'], 0)
+
+    def test_main_output_and_compare(self):
+        """Tests writing results as JSON and detecting regressions."""
+        output = os.path.join(self.directory, 'bench.json')
+        self.assertEqual(0, dummyserial.bench.main(
+            ['read_byte', '--scale', '0.001', '--repeat', '1',
+             '--output', output]))
+        with open(output) as output_file:
+            report = json.load(output_file)
+        self.assertEqual(['read_byte'],
+                         [result['name'] for result in report['results']])
+
+        report['results'][0]['ops_per_sec'] *= 1000
+        with open(output, 'w') as output_file:
+            json.dump(report, output_file)
+        self.assertEqual(1, dummyserial.bench.main(
+            ['read_byte', '--scale', '0.001', '--repeat', '1',
+             '--compare', output]))
+
+    def test_import_time(self):
+        """Tests importing dummyserial stays cheap and skips pyserial."""
+        seconds, modules = dummyserial.bench.import_time()
+        self.assertLess(seconds, 0.05)
+        self.assertIn('dummyserial.classes', modules)
+        for module in ('serial', 'json', 'logging'):
+            self.assertNotIn(module, modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Capture and Replay."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import serial
+
+from .context import dummyserial
+
+import dummyserial.capture
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class CaptureTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Capture and Replay."""
+
+    def setUp(self):  # pylint: disable=C0103
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'session.dscap')
+
+        clock = dummyserial.VirtualClock()
+        device = dummyserial.Serial(
+            port='/dev/ttyREC',
+            ds_responses={'ATI\r': 'DUMMY\r', 'ATZ\r': 'OK\r'},
+            ds_clock=clock,
+            ds_debug=False
+        )
+        with dummyserial.capture.Recorder(
+                device, self.path, clock=clock) as recorder:
+            recorder.write(b'ATI\r')
+            recorder.read(3)
+            clock.advance(1)
+            recorder.read(3)
+            recorder.write(b'AT?\r')
+            recorder.read(1)
+            recorder.write(b'ATZ\r')
+            recorder.read(3)
+            self.assertEqual('/dev/ttyREC', recorder.port)
+
+    def test_capture(self):
+        """Tests reading a capture through its index."""
+        with dummyserial.capture.Capture(self.path) as capture:
+            self.assertEqual(3, len(capture))
+            request, responses = capture.exchange(0)
+            self.assertEqual(b'ATI\r', request)
+            self.assertEqual([b'DUM', b'MY\r'], [bytes(r) for r in responses])
+            request, responses = capture.exchange(2)
+            self.assertEqual(b'ATZ\r', request)
+            self.assertEqual([b'OK\r'], [bytes(r) for r in responses])
+
+            records = [(kind, timestamp) for kind, timestamp, _ in
+                       capture.records(capture.write_offset(0))]
+            self.assertEqual(
+                [(b'W', 0), (b'R', 0), (b'R', 1), (b'W', 1), (b'W', 3),
+                 (b'R', 3)],
+                records)
+            del request, responses
+
+    def test_record_line_reads(self):
+        """Tests recording every kind of read of a loop:// port."""
+        path = os.path.join(os.path.dirname(self.path), 'loop.dscap')
+        port = serial.serial_for_url('loop://', timeout=1)
+        with dummyserial.capture.Recorder(port, path) as recorder:
+            recorder.write(b'hello\nworld\nfoo\nbar\n12345678')
+            recorder.readline()
+            recorder.read_until(b'\n')
+            recorder.readlines(5)
+            buf = bytearray(4)
+            self.assertEqual(4, recorder.readinto(buf))
+            recorder.read_all()
+
+        with dummyserial.capture.Capture(path) as capture:
+            request, responses = capture.exchange(0)
+            self.assertEqual(
+                [b'hello\n', b'world\n', b'foo\n', b'bar\n', b'1234',
+                 b'5678'],
+                [bytes(response) for response in responses])
+            del request, responses
+
+    def test_capture_without_index(self):
+        """Tests opening a truncated capture without an index."""
+        with open(self.path, 'rb') as capture_file:
+            data = capture_file.read()
+        with open(self.path, 'wb') as capture_file:
+            capture_file.write(data[:len(data) - 50])
+
+        with dummyserial.capture.Capture(self.path) as capture:
+            self.assertEqual(3, len(capture))
+            self.assertEqual([], capture.exchange(2)[1])
+
+    def test_not_a_capture(self):
+        """Tests opening a file which is not a capture."""
+        with open(self.path, 'wb') as capture_file:
+            capture_file.write(b'taco' * 10)
+        with self.assertRaises(dummyserial.DSIOError):
+            dummyserial.capture.Capture(self.path)
+
+    def test_replay(self):
+        """Tests replaying a capture to a Dummy Serial port."""
+        replay = dummyserial.capture.Replay(self.path)
+        ds_instance = dummyserial.Serial(
+            port='/dev/ttyREPLAY',
+            ds_replay=replay,
+            ds_debug=False
+        )
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(b'DUMMY\r', ds_instance.read(6))
+
+        replay.seek(2)
+        ds_instance.write(b'ATZ\r')
+        self.assertEqual(b'OK\r', ds_instance.read(3))
+        ds_instance.write(b'ATZ\r')
+        self.assertEqual(0, ds_instance.inWaiting())
+        self.assertEqual(1, ds_instance.stats.unmatched_writes)
+
+
+if __name__ == '__main__':
+    unittest.main()
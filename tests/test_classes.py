@@ -3,12 +3,21 @@
 
 """Tests for Dummy Serial Classes."""
 
+import io
+import json
+import os
 import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 import logging
 import logging.handlers
+from unittest import mock
 
-from serial.serialutil import SerialException
+from serial.serialutil import SerialException, SerialTimeoutException
 
 from . import constants
 from .context import dummyserial
@@ -41,7 +50,7 @@ class DummySerialTest(unittest.TestCase):  # pylint: disable=R0904
         :type alphabet: str
         """
         alphabet = alphabet or constants.ALPHANUM
-        return ''.join(random.choice(alphabet) for _ in xrange(length))
+        return ''.join(random.choice(alphabet) for _ in range(length))
 
     def setUp(self):  # pylint: disable=C0103
         """
@@ -71,16 +80,17 @@ class DummySerialTest(unittest.TestCase):  # pylint: disable=R0904
             ds_responses={rand_write_str1: rand_write_str2}
         )
 
-        ds_instance.write(rand_write_str1)
+        ds_instance.write(rand_write_str1.encode('latin1'))
 
-        read_data = ''
+        read_data = b''
         while 1:
-            read_data = ''.join([read_data, ds_instance.read(rand_write_len2)])
-            waiting_data = ds_instance.outWaiting()
+            read_data = b''.join(
+                [read_data, ds_instance.read(rand_write_len2)])
+            waiting_data = ds_instance.inWaiting()
             if not waiting_data:
                 break
 
-        self.assertEqual(read_data, rand_write_str2)
+        self.assertEqual(read_data, rand_write_str2.encode('latin1'))
 
     def test_write_closed_port(self):
         """Tests writing-to a closed Dummy Serial port."""
@@ -99,7 +109,7 @@ class DummySerialTest(unittest.TestCase):  # pylint: disable=R0904
         ds_instance.close()
         self.assertFalse(ds_instance._isOpen)  # pylint: disable=W0212
         with self.assertRaises(SerialException):
-            ds_instance.write(rand_write_str1)
+            ds_instance.write(rand_write_str1.encode('latin1'))
         self.assertFalse(ds_instance._isOpen)  # pylint: disable=W0212
 
     def test_write_and_read_to_closed_port(self):
@@ -116,7 +126,7 @@ class DummySerialTest(unittest.TestCase):  # pylint: disable=R0904
         )
 
         self.assertTrue(ds_instance._isOpen)  # pylint: disable=W0212
-        ds_instance.write(rand_write_str1)
+        ds_instance.write(rand_write_str1.encode('latin1'))
         ds_instance.close()
         self.assertFalse(ds_instance._isOpen)  # pylint: disable=W0212
         with self.assertRaises(SerialException):
@@ -184,20 +194,1082 @@ class DummySerialTest(unittest.TestCase):  # pylint: disable=R0904
 
         ds_instance = dummyserial.Serial(
             port=self.random_serial_port,
-            baudrate=self.random_baudrate
+            baudrate=self.random_baudrate,
+            ds_clock=dummyserial.VirtualClock()
         )
 
-        ds_instance.write(rand_write_str1)
+        ds_instance.write(rand_write_str1.encode('latin1'))
 
-        read_data = ''
+        read_data = b''
         while 1:
-            read_data = ''.join([read_data, ds_instance.read(rand_write_len2)])
-            waiting_data = ds_instance.outWaiting()
+            read_data = b''.join(
+                [read_data, ds_instance.read(rand_write_len2)])
+            waiting_data = ds_instance.inWaiting()
             if not waiting_data:
                 break
 
         self.assertEqual(
-            dummyserial.constants.NO_DATA_PRESENT, read_data)
+            dummyserial.constants.NO_DATA_PRESENT.encode('latin1'), read_data)
+
+    def test_short_read_virtual_clock(self):
+        """Tests a short read advances a virtual clock by the timeout."""
+        clock = dummyserial.VirtualClock()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            timeout=2,
+            ds_responses={'taco': 'yum'},
+            ds_clock=clock
+        )
+
+        ds_instance.write(b'taco')
+        self.assertEqual(b'y', ds_instance.read(1))
+        self.assertEqual(0, clock.elapsed)
+        self.assertEqual(b'um', ds_instance.read(10))
+        self.assertEqual(2, clock.elapsed)
+        self.assertEqual(2, clock.time())
+
+    def test_virtual_clock(self):
+        """Tests advancing a Virtual Clock."""
+        clock = dummyserial.VirtualClock(start=10)
+        clock.sleep(1.5)
+        clock.advance(0.5)
+        clock.sleep(-1)
+        self.assertEqual(12, clock.time())
+        self.assertEqual(2, clock.elapsed)
+
+    def test_readinto(self):
+        """Tests reading into a caller supplied buffer."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'taco': 'yum yum'},
+            ds_clock=dummyserial.VirtualClock()
+        )
+        ds_instance.write(b'taco')
+
+        buf = bytearray(3)
+        self.assertEqual(3, ds_instance.readinto(buf))
+        self.assertEqual(b'yum', bytes(buf))
+        buf = bytearray(8)
+        self.assertEqual(4, ds_instance.readinto(buf))
+        self.assertEqual(b' yum', bytes(buf[:4]))
+        self.assertEqual(0, ds_instance.inWaiting())
+
+    def test_byte_at_a_time_read(self):
+        """Tests reading a large response one byte at a time."""
+        response = self.random(4096).encode('latin1')
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'dump': response}
+        )
+        ds_instance.write(b'dump')
+
+        chunks = []
+        while ds_instance.inWaiting():
+            chunks.append(ds_instance.read(1))
+        self.assertEqual(response, b''.join(chunks))
+
+    def test_pacing(self):
+        """Tests responses are released at the configured baudrate."""
+        clock = dummyserial.VirtualClock()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            baudrate=9600,
+            timeout=1,
+            ds_responses={'taco': 'yum'},
+            ds_clock=clock,
+            ds_pacing=True
+        )
+        char_time = 10 / 9600.0
+        self.assertAlmostEqual(char_time, ds_instance.ds_char_time)
+
+        ds_instance.write(b'taco')
+        self.assertEqual(0, ds_instance.inWaiting())
+        clock.advance(char_time * 2)
+        self.assertEqual(2, ds_instance.inWaiting())
+
+        # A short read only waits until the requested bytes arrive.
+        self.assertEqual(b'yum', ds_instance.read(3))
+        self.assertAlmostEqual(char_time * 3, clock.elapsed)
+
+        # An unsatisfiable read waits for the full timeout.
+        ds_instance.write(b'taco')
+        self.assertEqual(b'yum', ds_instance.read(4))
+        self.assertAlmostEqual(1 + char_time * 3, clock.elapsed)
+
+    def test_latency(self):
+        """Tests responses become readable after their latency."""
+        clock = dummyserial.VirtualClock()
+        rules = dummyserial.RuleTable()
+        rules.add_prefix('SLOW', dummyserial.Delayed('zzz', 5))
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            timeout=1,
+            ds_responses={'taco': 'yum', 'now': dummyserial.Delayed('!', 0)},
+            ds_rules=rules,
+            ds_latency=0.25,
+            ds_clock=clock,
+            ds_debug=False
+        )
+
+        ds_instance.write(b'taco')
+        self.assertEqual(0, ds_instance.in_waiting)
+        self.assertEqual(b'yum', ds_instance.read(3))
+        self.assertAlmostEqual(0.25, clock.elapsed)
+
+        ds_instance.write(b'now')
+        self.assertEqual(1, ds_instance.in_waiting)
+        ds_instance.read(1)
+
+        # A device slower than the timeout answers after the read gave up.
+        ds_instance.write(b'SLOW?')
+        self.assertEqual(b'', ds_instance.read(3))
+        self.assertAlmostEqual(1.25, clock.elapsed)
+        clock.advance(4)
+        self.assertEqual(b'zzz', ds_instance.read(3))
+
+    def test_latency_jitter(self):
+        """Tests seeded latency distributions are reproducible."""
+        for distribution in ('uniform', 'gauss', 'exponential'):
+            elapsed = []
+            for _ in range(2):
+                clock = dummyserial.VirtualClock()
+                ds_instance = dummyserial.Serial(
+                    port=self.random_serial_port,
+                    ds_responses={'taco': 'yum'},
+                    ds_latency=dummyserial.Latency(
+                        0.01, 0.005, distribution, seed=42),
+                    ds_clock=clock,
+                    ds_debug=False
+                )
+                delays = []
+                for _ in range(1000):
+                    start = clock.time()
+                    ds_instance.write(b'taco')
+                    self.assertEqual(b'yum', ds_instance.read(3))
+                    delays.append(clock.time() - start)
+                elapsed.append(delays)
+            self.assertEqual(elapsed[0], elapsed[1])
+            self.assertTrue(min(elapsed[0]) >= 0)
+            self.assertGreater(len(set(elapsed[0])), 900)
+            mean = sum(elapsed[0]) / len(elapsed[0])
+            self.assertAlmostEqual(
+                0.015 if distribution == 'exponential' else 0.01,
+                mean, places=3)
+
+        with self.assertRaises(dummyserial.DSIOError):
+            dummyserial.Latency(0.01, 0.005, 'lognormal')
+
+    def test_impairment(self):
+        """Tests received data is impaired reproducibly under a seed."""
+        responses = {'dump': b'\x00' * 100000}
+        reads = []
+        for _ in range(2):
+            impairment = dummyserial.Impairment(
+                flip_rate=0.001, drop_rate=0.001, insert_rate=0.001, seed=7)
+            ds_instance = dummyserial.Serial(
+                port=self.random_serial_port,
+                ds_responses=responses,
+                ds_impairment=impairment,
+                ds_clock=dummyserial.VirtualClock(),
+                ds_debug=False
+            )
+            ds_instance.write(b'dump')
+            reads.append(ds_instance.read_all())
+        self.assertEqual(reads[0], reads[1])
+        self.assertEqual(
+            100000 - impairment.drops + impairment.inserts, len(reads[0]))
+        for count in (impairment.flips, impairment.drops, impairment.inserts):
+            self.assertTrue(50 < count < 150, count)
+
+    def test_rx_overflow(self):
+        """Tests the receive FIFO overflow policies."""
+        expected = {
+            'drop-newest': b'12345123',
+            'drop-oldest': b'34512345',
+        }
+        for policy, waiting in expected.items():
+            ds_instance = dummyserial.Serial(
+                port=self.random_serial_port,
+                ds_responses={'a': '12345'},
+                ds_streaming=True,
+                ds_rx_capacity=8,
+                ds_overflow=policy,
+                ds_clock=dummyserial.VirtualClock(),
+                ds_debug=False
+            )
+            ds_instance.write(b'aa')
+            self.assertEqual(waiting, ds_instance.read(10))
+            self.assertEqual(2, ds_instance.stats.rx_overruns)
+
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'a': '12345'},
+            ds_streaming=True,
+            ds_rx_capacity=8,
+            ds_overflow='raise',
+            ds_debug=False
+        )
+        ds_instance.write(b'a')
+        with self.assertRaises(dummyserial.DSOverflowError):
+            ds_instance.write(b'a')
+
+        with self.assertRaises(dummyserial.DSIOError):
+            dummyserial.Serial(port=self.random_serial_port, ds_overflow='?')
+
+    def test_rx_overflow_lazy(self):
+        """Tests lazy responses pulled by large reads never overrun."""
+        for policy in ('drop-newest', 'drop-oldest', 'raise'):
+            ds_instance = dummyserial.Serial(
+                port=self.random_serial_port,
+                ds_responses={'lazy': (b'0123456789' for _ in range(2))},
+                ds_rx_capacity=8,
+                ds_overflow=policy,
+                ds_clock=dummyserial.VirtualClock(),
+                ds_debug=False
+            )
+            ds_instance.write(b'lazy')
+            self.assertEqual(b'0123456789012345', ds_instance.read(16))
+            self.assertEqual(0, ds_instance.stats.rx_overruns)
+            self.assertEqual(b'6789', ds_instance.read(16))
+
+        # Only the bytes of the overflowing write are overruns, however far
+        # the waiting data already is above the capacity.
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'a': '12345'},
+            ds_streaming=True,
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+        ds_instance.write(b'aa')
+        ds_instance.ds_rx_capacity = 4
+        ds_instance.write(b'a')
+        self.assertEqual(5, ds_instance.stats.rx_overruns)
+        self.assertEqual(b'1234512345', ds_instance.read(16))
+
+    def test_rx_overflow_block(self):
+        """Tests a blocked writer is held off until reads make room."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={
+                'dump': b'x' * 100000,
+                'lazy': (b'y' * 5000 for _ in range(20)),
+            },
+            ds_streaming=True,
+            ds_rx_capacity=1024,
+            ds_overflow='block',
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+        ds_instance.write(b'dumplazy')
+        self.assertEqual(1024, ds_instance.in_waiting)
+        self.assertEqual(b'x' * 4096, ds_instance.read(4096))
+
+        total = 4096
+        while True:
+            self.assertLessEqual(ds_instance.in_waiting, 1024)
+            data = ds_instance.read(500)
+            if not data:
+                break
+            total += len(data)
+        self.assertEqual(200000, total)
+        self.assertEqual(0, ds_instance.stats.rx_overruns)
+
+    def test_rx_overflow_block_limit(self):
+        """Tests writes time out once too many responses are held off."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'a': 'x' * 20},
+            ds_streaming=True,
+            ds_rx_capacity=16,
+            ds_overflow='block',
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+        limit = dummyserial.constants.MAX_HELD_RESPONSES
+        for _ in range(limit):
+            ds_instance.write(b'a')
+        with self.assertRaises(SerialTimeoutException):
+            ds_instance.write(b'a')
+        self.assertEqual(b'x' * 20 * limit, ds_instance.read(20 * limit))
+        ds_instance.write(b'a')
+        self.assertEqual(b'x' * 20, ds_instance.read(20))
+
+    def test_tx_overflow(self):
+        """Tests the paced transmit FIFO and its overflow policies."""
+        def paced_port(policy, **kwargs):
+            """Returns a port with a 16 byte transmit FIFO."""
+            return dummyserial.Serial(
+                port=self.random_serial_port,
+                ds_pacing=True,
+                ds_tx_capacity=16,
+                ds_overflow=policy,
+                ds_clock=dummyserial.VirtualClock(),
+                ds_debug=False,
+                **kwargs
+            )
+
+        ds_instance = paced_port('drop-newest')
+        char_time = ds_instance.ds_char_time
+        ds_instance.write(b'0123456789')
+        self.assertEqual(10, ds_instance.out_waiting())
+        ds_instance.write(b'0123456789')
+        self.assertEqual(16, ds_instance.out_waiting())
+        self.assertEqual(4, ds_instance.stats.tx_overruns)
+        ds_instance.flush()
+        self.assertEqual(0, ds_instance.out_waiting())
+        self.assertAlmostEqual(16 * char_time, ds_instance.ds_clock.elapsed)
+
+        ds_instance = paced_port('drop-oldest')
+        ds_instance.write(b'0123456789' * 2)
+        self.assertEqual(16, ds_instance.out_waiting())
+        self.assertEqual(4, ds_instance.stats.tx_overruns)
+
+        ds_instance = paced_port('block', write_timeout=1)
+        ds_instance.write(b'0123456789')
+        ds_instance.write(b'0123456789')
+        self.assertAlmostEqual(4 * char_time, ds_instance.ds_clock.elapsed)
+        self.assertEqual(16, ds_instance.out_waiting())
+        with self.assertRaises(SerialTimeoutException):
+            ds_instance.write(b'x' * 20000)
+
+        ds_instance = paced_port('raise')
+        with self.assertRaises(dummyserial.DSOverflowError):
+            ds_instance.write(b'x' * 17)
+
+    def test_char_time(self):
+        """Tests character time includes parity and stop bits."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            baudrate=115200,
+            bytesize=7,
+            parity='E',
+            stopbits=2
+        )
+        self.assertAlmostEqual(11 / 115200.0, ds_instance.ds_char_time)
+
+    def test_streaming_fragmented_write(self):
+        """Tests streaming matches of requests split across writes."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'ATZ\r': 'OK\r', 'ATI\r': 'DUMMY\r'},
+            ds_streaming=True
+        )
+
+        for byte in b'ATZ\r':
+            ds_instance.write(bytes(bytearray([byte])))
+        self.assertEqual(b'OK\r', ds_instance.read(3))
+
+    def test_streaming_pipelined_write(self):
+        """Tests streaming matches of requests pipelined in one write."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'ATZ\r': 'OK\r', 'ATI\r': 'DUMMY\r'},
+            ds_streaming=True
+        )
+
+        ds_instance.write(b'noiseATI\rATZ')
+        ds_instance.write(b'\rATI\r')
+        self.assertEqual(15, ds_instance.inWaiting())
+        self.assertEqual(b'DUMMY\rOK\rDUMMY\r', ds_instance.read(15))
+
+    def test_rules(self):
+        """Tests falling back from ds_responses to ds_rules."""
+        rules = dummyserial.RuleTable([
+            ('prefix', 'AT+CSQ', '+CSQ: 10,0\r'),
+            ('regex', br'AT\+ECHO=(?P<text>\w+)\r',
+             lambda request, match: match.group('text') + b'\r'),
+        ])
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'ATZ\r': 'OK\r'},
+            ds_rules=rules,
+            ds_clock=dummyserial.VirtualClock()
+        )
+
+        ds_instance.write(b'ATZ\r')
+        self.assertEqual(b'OK\r', ds_instance.read(3))
+        ds_instance.write(b'AT+CSQ?\r')
+        self.assertEqual(b'+CSQ: 10,0\r', ds_instance.read(11))
+        ds_instance.write(b'AT+ECHO=taco\r')
+        self.assertEqual(b'taco\r', ds_instance.read(5))
+        ds_instance.write(b'AT+NOPE\r')
+        self.assertEqual(0, ds_instance.inWaiting())
+
+    def test_shared_response_table(self):
+        """Tests sharing a Response Table between ports."""
+        table = dummyserial.ResponseTable({'taco': 'yum', b'\xff': b'\x00'})
+        ports = [
+            dummyserial.Serial(port=str(number), ds_responses=table,
+                               ds_streaming=bool(number % 2))
+            for number in range(4)
+        ]
+
+        for ds_instance in ports:
+            self.assertIs(table, ds_instance.ds_responses)
+            ds_instance.write(b'taco')
+            self.assertEqual(b'yum', ds_instance.read(3))
+            ds_instance.write(b'\xff')
+            self.assertEqual(b'\x00', ds_instance.read(1))
+        self.assertIs(
+            ports[1]._matcher,  # pylint: disable=W0212
+            ports[3]._matcher)  # pylint: disable=W0212
+
+    def test_debug_disabled(self):
+        """Tests disabling logging removes it from read and write."""
+        logger = logging.getLogger('dummyserial.classes')
+        with mock.patch.object(logger, 'debug') as debug:
+            ds_instance = dummyserial.Serial(
+                port=self.random_serial_port,
+                ds_responses={'taco': 'yum'},
+                ds_clock=dummyserial.VirtualClock(),
+                ds_debug=False
+            )
+            ds_instance.write(b'taco')
+            self.assertEqual(b'y', ds_instance.read(1))
+            self.assertEqual(b'um', ds_instance.read(3))
+        self.assertFalse(debug.called)
+
+    def test_trace(self):
+        """Tests structured tracing of writes, reads and timeouts."""
+        trace = dummyserial.TraceBuffer()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            timeout=2,
+            ds_responses={'taco': 'yum'},
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False,
+            ds_trace=trace
+        )
+        ds_instance.write(b'taco')
+        ds_instance.read(4)
+
+        self.assertEqual(
+            [('write', 0, b'taco'), ('timeout', 0, 2), ('read', 2, b'yum')],
+            [(record.event, record.time, record.data)
+             for record in trace.records])
+        self.assertEqual(self.random_serial_port, trace.records[0].port)
+        trace.clear()
+        self.assertEqual(0, len(trace))
+
+    def test_stats(self):
+        """Tests per-port counters and histograms."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            timeout=0.5,
+            ds_responses={'taco': 'yum'},
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+        ds_instance.write(b'taco')
+        ds_instance.read(1)
+        ds_instance.read(10)
+        ds_instance.write(b'nope')
+
+        snapshot = ds_instance.stats.snapshot()
+        self.assertEqual(2, snapshot['read_calls'])
+        self.assertEqual(3, snapshot['read_bytes'])
+        self.assertEqual(2, snapshot['write_calls'])
+        self.assertEqual(8, snapshot['write_bytes'])
+        self.assertEqual(1, snapshot['matched_writes'])
+        self.assertEqual(1, snapshot['unmatched_writes'])
+        self.assertEqual(1, snapshot['timeouts'])
+        self.assertEqual(0.5, snapshot['blocked_time'])
+        self.assertEqual([0, 1, 1, 0, 0, 0, 0], snapshot['read_sizes'])
+        self.assertEqual([0, 0, 0, 0, 1, 0, 0], snapshot['blocked_times'])
+
+        total = dummyserial.SerialStats.aggregate(
+            [ds_instance.stats, snapshot])
+        self.assertEqual(4, total['read_calls'])
+        self.assertEqual([0, 2, 2, 0, 0, 0, 0], total['read_sizes'])
+
+        ds_instance.stats.reset()
+        self.assertEqual(
+            dummyserial.SerialStats().snapshot(),
+            ds_instance.stats.snapshot())
+
+    def test_readline(self):
+        """Tests reading lines from the waiting data."""
+        clock = dummyserial.VirtualClock()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            timeout=1,
+            ds_responses={'ATI\r': 'DUMMY\r\nOK\r\npartial'},
+            ds_clock=clock,
+            ds_debug=False
+        )
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(18, ds_instance.in_waiting)
+        self.assertEqual(0, ds_instance.out_waiting())
+
+        self.assertEqual(b'DUMMY\r\n', ds_instance.readline())
+        self.assertEqual(b'OK', ds_instance.readline(2))
+        self.assertEqual(b'\r\n', ds_instance.read_until(b'\r\n'))
+        self.assertEqual(0, clock.elapsed)
+        self.assertEqual(b'partial', ds_instance.readline())
+        self.assertEqual(1, clock.elapsed)
+        self.assertEqual(1, ds_instance.stats.timeouts)
+
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(
+            [b'DUMMY\r\n', b'OK\r\n', b'partial'], ds_instance.readlines())
+
+    def test_readline_paced(self):
+        """Tests reading a line as paced data arrives."""
+        clock = dummyserial.VirtualClock()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            baudrate=9600,
+            timeout=1,
+            ds_responses={'ATI\r': 'DUMMY\nOK\n'},
+            ds_clock=clock,
+            ds_pacing=True,
+            ds_debug=False
+        )
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(b'DUMMY\n', ds_instance.readline())
+        self.assertAlmostEqual(6 * ds_instance.ds_char_time, clock.elapsed)
+
+    def test_read_without_timeout(self):
+        """Tests blocking reads return once no more data can arrive."""
+        clock = dummyserial.VirtualClock()
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            baudrate=9600,
+            timeout=None,
+            ds_responses={'ATI\r': 'DUMMY\npartial', 'AT\r': 'OK'},
+            ds_clock=clock,
+            ds_debug=False
+        )
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(b'DUMMY\n', ds_instance.readline())
+        self.assertEqual(b'partial', ds_instance.read_until(b'\r'))
+        ds_instance.write(b'AT\r')
+        self.assertEqual(b'OK', ds_instance.read(10))
+        self.assertEqual(0, clock.elapsed)
+        self.assertEqual(0, ds_instance.stats.timeouts)
+
+        ds_instance.ds_pacing = True
+        ds_instance.write(b'ATI\r')
+        self.assertEqual(b'DUMMY\npart', ds_instance.read(10))
+        self.assertAlmostEqual(10 * ds_instance.ds_char_time, clock.elapsed)
+        self.assertEqual(b'ial', ds_instance.read_until(b'\r'))
+        self.assertAlmostEqual(13 * ds_instance.ds_char_time, clock.elapsed)
+
+    def test_reset_input_buffer(self):
+        """Tests discarding waiting input data."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={'taco': 'yum'}
+        )
+        ds_instance.write(b'taco')
+        ds_instance.reset_input_buffer()
+        ds_instance.reset_output_buffer()
+        ds_instance.flush()
+        self.assertEqual(0, ds_instance.in_waiting)
+        ds_instance.close()
+        with self.assertRaises(SerialException):
+            ds_instance.reset_input_buffer()
+
+    def test_lazy_responses(self):
+        """Tests generator, file and callable responses are lazy."""
+        pulled = []
+
+        def dump():
+            for number in range(1000):
+                pulled.append(number)
+                yield b'x' * 1024
+
+        chunks = [b'c1', b'c2']
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port,
+            ds_responses={
+                'dump': dump(),
+                'file': io.BytesIO(b'file\n' * 3),
+                'call': lambda: chunks.pop(0) if chunks else None,
+                'ATI': 'DUMMY',
+            },
+            ds_streaming=True,
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+
+        ds_instance.write(b'dumpATI')
+        self.assertEqual(1024, ds_instance.in_waiting)
+        self.assertEqual([0], pulled)
+        self.assertEqual(b'x' * 10, ds_instance.read(10))
+        self.assertEqual(b'x' * 2048, ds_instance.read(2048))
+        self.assertEqual([0, 1, 2], pulled)
+        self.assertEqual(1014, ds_instance.in_waiting)
+
+        total = 2058
+        while True:
+            data = ds_instance.read_all()
+            if not data:
+                break
+            total += len(data)
+        self.assertEqual(1000 * 1024 + 5, total)
+
+        ds_instance.write(b'filecall')
+        self.assertEqual(b'file\n', ds_instance.readline())
+        self.assertEqual(
+            [b'file\n', b'file\n', b'c1c2'], ds_instance.readlines())
+
+    def test_lazy_responses_reused(self):
+        """Tests seekable files and factories are replayed by every use."""
+        def dump():
+            for number in range(3):
+                yield str(number) * 1024
+
+        table = dummyserial.ResponseTable({
+            'file': io.BytesIO(b'abc' * 2048),
+            'dump': dump,
+        })
+        ports = [
+            dummyserial.Serial(
+                port=str(number), ds_responses=table, ds_streaming=True,
+                ds_clock=dummyserial.VirtualClock(), ds_debug=False)
+            for number in range(2)]
+        for ds_instance in ports:
+            ds_instance.write(b'filedump')
+        for ds_instance in ports * 2:
+            self.assertEqual(b'abc' * 1024, ds_instance.read(3072))
+        for ds_instance in ports:
+            self.assertEqual(
+                b'0' * 1024 + b'1' * 1024 + b'2' * 1024,
+                ds_instance.read(3072))
+
+        ports[0].write(b'file')
+        self.assertEqual(b'abc' * 2048, ports[0].read(6144))
+
+    def test_memory_footprint(self):
+        """Tests slotted ports stay around 1KB each while idle."""
+        ds_instance = dummyserial.Serial(
+            port=self.random_serial_port, xonxoff=True, write_timeout=1)
+        with mock.patch.object(ds_instance, 'write') as write:
+            ds_instance.write(b'taco')
+        write.assert_called_once_with(b'taco')
+        ds_instance.custom = 1
+        self.assertEqual(1, ds_instance.custom)
+        self.assertTrue(ds_instance.xonxoff)
+        self.assertEqual(1, ds_instance.write_timeout)
+        self.assertIsNone(ds_instance.inter_byte_timeout)
+
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            ports = [
+                dummyserial.Serial(port=str(number), ds_debug=False)
+                for number in range(1000)]
+            per_port = (tracemalloc.get_traced_memory()[0] - before) / 1000.0
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(1000, len(ports))
+        self.assertLess(per_port, 1536)
+
+
+class ImpairmentTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Impairment."""
+
+    def test_clean_line(self):
+        """Tests a zero rate line passes data through untouched."""
+        data = b'x' * 1024
+        self.assertIs(data, dummyserial.Impairment(seed=1)(data))
+
+    def test_flips(self):
+        """Tests flips change exactly one bit of a byte."""
+        impairment = dummyserial.Impairment(flip_rate=0.01, seed=3)
+        data = bytes(bytearray(range(256))) * 100
+        impaired = impairment(data)
+        self.assertEqual(len(data), len(impaired))
+        changed = [
+            bin(old ^ new).count('1')
+            for old, new in zip(bytearray(data), bytearray(impaired))
+            if old != new]
+        self.assertEqual([1] * impairment.flips, changed)
+
+    def test_every_byte(self):
+        """Tests a rate of 1 affects every byte."""
+        self.assertEqual(b'', dummyserial.Impairment(drop_rate=1)(b'abc'))
+        self.assertEqual(
+            6, len(dummyserial.Impairment(insert_rate=1)(b'abc')))
+
+
+class ThreadSafeSerialTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Thread Safe Serial."""
+
+    def test_read_woken_by_write(self):
+        """Tests a blocked read returns as soon as a write answers it."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyTS',
+            timeout=10,
+            ds_responses={'taco': 'yum'},
+            ds_debug=False
+        )
+        result = []
+        reader = threading.Thread(
+            target=lambda: result.append(ds_instance.read(3)))
+
+        start = time.time()
+        reader.start()
+        time.sleep(0.05)
+        ds_instance.write(b'taco')
+        reader.join(5)
+
+        self.assertEqual([b'yum'], result)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(1, ds_instance.stats.timeouts)
+        self.assertLess(ds_instance.stats.blocked_time, 5)
+
+    def test_read_timeout(self):
+        """Tests a blocked read returns what is available at timeout."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyTS',
+            timeout=0.05,
+            ds_responses={'taco': 'yum'},
+            ds_debug=False
+        )
+        ds_instance.write(b'taco')
+        self.assertEqual(b'yum', ds_instance.read(10))
+        self.assertGreaterEqual(ds_instance.stats.blocked_time, 0.04)
+
+    def test_latency_real_clock(self):
+        """Tests a read waits for the latency, not the timeout."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyTS',
+            timeout=2,
+            ds_responses={'taco': 'yum'},
+            ds_latency=0.05,
+            ds_debug=False
+        )
+        start = time.time()
+        ds_instance.write(b'taco')
+        self.assertEqual(b'yum', ds_instance.read(3))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+        self.assertLess(time.time() - start, 1)
+
+    def test_readline_woken_by_write(self):
+        """Tests a blocked readline returns once a line is complete."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyTS',
+            timeout=10,
+            ds_responses={'a': 'DUM', 'b': 'MY\nOK'},
+            ds_debug=False
+        )
+        result = []
+        reader = threading.Thread(
+            target=lambda: result.append(ds_instance.readline()))
+        reader.start()
+        ds_instance.write(b'a')
+        time.sleep(0.05)
+        self.assertEqual([], result)
+        ds_instance.write(b'b')
+        reader.join(5)
+        self.assertEqual([b'MY\n'], result)
+
+    def test_concurrent_reader_and_writer(self):
+        """Tests a reader thread and a writer thread sharing a port."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyTS',
+            timeout=5,
+            ds_responses={'ping': 'pong'},
+            ds_streaming=True,
+            ds_debug=False
+        )
+        count = 2000
+        received = []
+
+        def read():
+            while len(received) < count * 4:
+                received.extend(bytearray(ds_instance.read(4)))
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for _ in range(count):
+            ds_instance.write(b'pi')
+            ds_instance.write(b'ng')
+        reader.join(10)
+
+        self.assertEqual(b'pong' * count, bytes(bytearray(received)))
+
+    def test_linked_pair_threads(self):
+        """Tests threads writing both ways across a linked pair."""
+        registry = dummyserial.PortRegistry(dummyserial.ThreadSafeSerial)
+        port_a, port_b = registry.pair(
+            '/dev/ttyA', '/dev/ttyB', timeout=5, ds_debug=False)
+        chunk = b'x' * 1024
+
+        def pump(source, sink):
+            for _ in range(256):
+                source.write(chunk)
+            sink.extend(source._peer.read(256 * 1024))  # pylint: disable=W0212
+
+        received_a = bytearray()
+        received_b = bytearray()
+        threads = [
+            threading.Thread(target=pump, args=(port_a, received_b)),
+            threading.Thread(target=pump, args=(port_b, received_a)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(256 * 1024, len(received_a))
+        self.assertEqual(256 * 1024, len(received_b))
+
+    def test_link_mismatch(self):
+        """Tests a thread safe port cannot be linked to a plain one."""
+        ports = (
+            dummyserial.ThreadSafeSerial(port='/dev/ttyA', ds_debug=False),
+            dummyserial.Serial(port='/dev/ttyB', ds_debug=False))
+        for port_a, port_b in (ports, ports[::-1]):
+            with self.assertRaises(dummyserial.DSTypeError):
+                port_a.link(port_b)
+            self.assertIsNone(port_a._peer)  # pylint: disable=W0212
+
+    def test_linked_pair_block(self):
+        """Tests a writer waits for the reader of a full linked peer."""
+        registry = dummyserial.PortRegistry(dummyserial.ThreadSafeSerial)
+        port_a, port_b = registry.pair(
+            '/dev/ttyA', '/dev/ttyB', timeout=5, write_timeout=5,
+            ds_rx_capacity=1024, ds_overflow='block', ds_debug=False)
+
+        def pump():
+            for _ in range(64):
+                port_a.write(b'x' * 4096)
+
+        thread = threading.Thread(target=pump)
+        thread.start()
+        received = 0
+        while received < 64 * 4096:
+            self.assertLessEqual(port_b.in_waiting, 1024)
+            data = port_b.read(1024)
+            self.assertTrue(data)
+            received += len(data)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(0, port_b.stats.rx_overruns)
+
+        port_a.write_timeout = 0.05
+        port_a.write(b'x' * 1024)
+        port_a.write(b'y')
+        with self.assertRaises(SerialTimeoutException):
+            port_a.write(b'z')
+        self.assertEqual(b'x' * 1024 + b'y', port_b.read(1025))
+        self.assertEqual(0, port_b.in_waiting)
+
+    def test_paced_flush(self):
+        """Tests flushing the paced transmit FIFO of a real clock port."""
+        ds_instance = dummyserial.ThreadSafeSerial(
+            port='/dev/ttyFLUSH', baudrate=115200, ds_pacing=True,
+            ds_debug=False)
+        ds_instance.write(b'hello')
+        self.assertLessEqual(ds_instance.out_waiting(), 5)
+        ds_instance.flush()
+        self.assertEqual(0, ds_instance.out_waiting())
+        ds_instance.write(b'hello')
+        ds_instance.reset_output_buffer()
+        self.assertEqual(0, ds_instance.out_waiting())
+
+
+class PortRegistryTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Port Registry."""
+
+    def test_open_shared_device(self):
+        """Tests opening a port name twice shares the device."""
+        registry = dummyserial.PortRegistry()
+        port_1 = registry.open('/dev/ttyR0', ds_responses={'taco': 'yum'})
+        port_2 = registry.open('/dev/ttyR0')
+        self.assertIs(port_1, port_2)
+        self.assertTrue('/dev/ttyR0' in registry)
+
+        port_1.write(b'taco')
+        self.assertEqual(b'yum', port_2.read(3))
+
+        port_1.close()
+        self.assertIs(port_1, registry.open('/dev/ttyR0'))
+        self.assertTrue(port_1._isOpen)  # pylint: disable=W0212
+
+        registry.clear()
+        self.assertEqual(0, len(registry))
+        self.assertFalse(port_1._isOpen)  # pylint: disable=W0212
+
+    def test_null_modem_pair(self):
+        """Tests bytes written to one side appear on the other."""
+        registry = dummyserial.PortRegistry()
+        port_a, port_b = registry.pair(
+            '/dev/ttyA', '/dev/ttyB', ds_responses={'taco': 'yum'})
+        self.assertEqual(2, len(registry))
+
+        port_a.write(b'taco')
+        port_a.write(b'!')
+        port_b.write(b'hello')
+        self.assertEqual(b'taco!', port_b.read(5))
+        self.assertEqual(b'hello', port_a.read(5))
+
+        port_a.rts = False
+        self.assertFalse(port_b.cts)
+        self.assertTrue(port_b.dsr and port_b.cd)
+        port_a.dtr = False
+        self.assertFalse(port_b.dsr or port_b.cd or port_b.ri)
+        self.assertTrue(port_a.cts)
+
+        with self.assertRaises(dummyserial.DSIOError):
+            registry.pair('/dev/ttyA', '/dev/ttyC')
+
+
+class ResponseTableTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Response Table."""
+
+    def test_encoded_mapping(self):
+        """Tests keys and values are stored as bytes."""
+        table = dummyserial.ResponseTable([('taco', 'yum'), (b'a', b'b')])
+        self.assertEqual(2, len(table))
+        self.assertEqual(b'yum', table[b'taco'])
+        self.assertTrue(b'a' in table)
+        self.assertFalse('taco' in table)
+        self.assertEqual(set([b'taco', b'a']), set(table))
+        with self.assertRaises(TypeError):
+            table[b'x'] = b'y'  # pylint: disable=E1137
+
+    def test_from_file(self):
+        """Tests loading a Response Table from a JSON file."""
+        handle, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as json_file:
+            json.dump({'taco': 'yum', 'caf\xe9': '\xff'}, json_file)
+
+        table = dummyserial.ResponseTable.from_file(path)
+        self.assertEqual(b'yum', table[b'taco'])
+        self.assertEqual(b'\xff', table[b'caf\xe9'])
+
+
+class RuleTableTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Rule Table."""
+
+    def test_dispatch_order(self):
+        """Tests literal, prefix, regex and callable rule priority."""
+        rules = dummyserial.RuleTable()
+        rules.add_callable(lambda request: b'callable')
+        rules.add_regex(br'(a)(b)?x+', b'regex1')
+        rules.add_regex(br'a(?P<n>\d+)', lambda r, m: m.group('n') * 2)
+        rules.add_prefix(b'ab', b'prefix-ab')
+        rules.add_prefix(b'abc', b'prefix-abc')
+        rules.add_literal(b'abcd', b'literal')
+        self.assertEqual(6, len(rules))
+
+        self.assertEqual(b'literal', rules.lookup(b'abcd'))
+        self.assertEqual(b'prefix-abc', rules.lookup(b'abce'))
+        self.assertEqual(b'prefix-ab', rules.lookup(b'abx'))
+        self.assertEqual(b'regex1', rules.lookup(b'axxx'))
+        self.assertEqual(b'4242', rules.lookup(b'a42'))
+        self.assertEqual(b'callable', rules.lookup(b'zzz'))
+
+    def test_unknown_kind(self):
+        """Tests adding a rule of an unknown kind."""
+        with self.assertRaises(dummyserial.DSTypeError):
+            dummyserial.RuleTable([('glob', '*', 'x')])
+
+    def test_regex_group_names(self):
+        """Tests regexes reusing a group name keep their own groups."""
+        rules = dummyserial.RuleTable()
+        rules.add_regex(br'A(?P<n>\d)', lambda r, m: b'A' + m.group('n'))
+        rules.add_regex(br'B(?P<n>\d)(?P<m>\d)', lambda r, m: m.group('m'))
+        rules.add_regex(br'C(?P<m>\d)', lambda r, m: b'C' + m.group('m'))
+        self.assertEqual(b'A1', rules.lookup(b'A1'))
+        self.assertEqual(b'3', rules.lookup(b'B23'))
+        self.assertEqual(b'C4', rules.lookup(b'C4'))
+
+    def test_regex_flags(self):
+        """Tests compiled regex flags are kept."""
+        rules = dummyserial.RuleTable()
+        rules.add_regex(b'x', b'x')
+        rules.add_regex(re.compile(b'hello', re.I), b'hi')
+        rules.add_regex(b'(?s)a.b', b'ab')
+        self.assertEqual(b'hi', rules.lookup(b'HELLO'))
+        self.assertEqual(b'ab', rules.lookup(b'a\nb'))
+
+    def test_regex_backreference(self):
+        """Tests numbered backreferences after other regexes."""
+        rules = dummyserial.RuleTable()
+        rules.add_regex(br'(x)(y)', b'xy')
+        rules.add_regex(br'(a)\1', b'double')
+        rules.add_regex(br'(b)?(?(1)c|d)', b'conditional')
+        rules.add_regex(br'(z)', b'z')
+        self.assertEqual(b'double', rules.lookup(b'aa'))
+        self.assertIsNone(rules.lookup(b'ab'))
+        self.assertEqual(b'conditional', rules.lookup(b'bc'))
+        self.assertEqual(b'conditional', rules.lookup(b'd'))
+        self.assertEqual(b'z', rules.lookup(b'z'))
+
+    def test_regex_text_pattern(self):
+        """Tests compiled str regexes are matched as latin1 bytes."""
+        rules = dummyserial.RuleTable()
+        rules.add_regex(re.compile('caf\xe9 (\\d+)'), lambda r, m: m.group(1))
+        rules.add_regex(re.compile('ok', re.I), b'OK')
+        self.assertEqual(b'12', rules.lookup(b'caf\xe9 12'))
+        self.assertEqual(b'OK', rules.lookup(b'Ok'))
+
+    def test_many_literals_and_prefixes(self):
+        """Tests lookups in a large compiled table."""
+        rules = dummyserial.RuleTable()
+        for number in range(20000):
+            rules.add_literal('READ {0}'.format(number), str(number))
+            rules.add_prefix('SET {0} '.format(number), 'OK')
+        self.assertEqual(b'12345', rules.lookup(b'READ 12345'))
+        self.assertEqual(b'OK', rules.lookup(b'SET 19999 on'))
+        self.assertIsNone(rules.lookup(b'SET 20000 on'))
+
+
+class StreamMatcherTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Stream Matcher."""
+
+    def test_scan(self):
+        """Tests matching overlapping keys across scans."""
+        matcher = dummyserial.StreamMatcher(['he', 'she', 'hers', b'his', ''])
+        self.assertEqual(4, len(matcher))
+
+        matches, state = matcher.scan(b'ush')
+        self.assertEqual([], matches)
+        matches, state = matcher.scan(b'ershis', state)
+        self.assertEqual(['she', b'his'], matches)
+        self.assertEqual(0, state)
+
+        matches, _ = matcher.scan(b'hhe')
+        self.assertEqual(['he'], matches)
+
+
+class ByteBufferTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Byte Buffer."""
+
+    def test_read_and_compact(self):
+        """Tests reads across a compaction of the buffer."""
+        data = bytes(bytearray(range(256))) * 64
+        buf = dummyserial.ByteBuffer(data)
+        self.assertEqual(data[:10], buf.read(10))
+        self.assertEqual(data[10:10000], buf.read(9990))
+        buf.write(b'tail')
+        self.assertEqual(len(data) - 10000 + 4, len(buf))
+        self.assertEqual(data[10000:10004], buf.peek(4))
+        self.assertEqual(data[10000:] + b'tail', buf.read(len(buf) + 10))
+        self.assertFalse(buf)
+
+    def test_find(self):
+        """Tests searching the unread part of the buffer."""
+        buf = dummyserial.ByteBuffer(b'ab\ncd\nef')
+        buf.read(2)
+        self.assertEqual(0, buf.find(b'\n'))
+        self.assertEqual(3, buf.find(b'\n', 1))
+        self.assertEqual(-1, buf.find(b'\n', 1, 3))
+        self.assertEqual(-1, buf.find(b'ab'))
+
+    def test_readinto_memoryview(self):
+        """Tests reading into part of a memoryview."""
+        buf = dummyserial.ByteBuffer(b'abcdef')
+        target = bytearray(b'......')
+        self.assertEqual(4, buf.readinto(memoryview(target)[2:]))
+        self.assertEqual(b'..abcd', bytes(target))
+        self.assertEqual(b'ef', buf.read(5))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Disk-Backed Response Tables."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.disktable
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class DiskResponseTableTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Disk-Backed Response Tables."""
+
+    def setUp(self):  # pylint: disable=C0103
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.table = dummyserial.disktable.DiskResponseTable.build(
+            os.path.join(directory, 'profile.db'),
+            (('READ {0}\r'.format(number), '{0}\r'.format(number))
+             for number in range(10000)),
+            cache_size=8
+        )
+        self.addCleanup(self.table.close)
+
+    def test_mapping(self):
+        """Tests looking up requests in the table."""
+        self.assertEqual(10000, len(self.table))
+        self.assertEqual(b'42\r', self.table[b'READ 42\r'])
+        self.assertTrue(b'READ 9999\r' in self.table)
+        self.assertFalse(b'READ 10000\r' in self.table)
+        self.assertIsNone(self.table.get(b'nope'))
+        with self.assertRaises(KeyError):
+            self.table[b'nope']  # pylint: disable=W0104
+        self.assertEqual(10000, len(list(self.table)))
+
+    def test_cache_is_bounded(self):
+        """Tests the LRU cache never exceeds its size."""
+        for number in range(100):
+            self.table.get('READ {0}\r'.format(number).encode())
+        self.assertEqual(8, len(self.table._cache))  # pylint: disable=W0212
+
+    def test_serial(self):
+        """Tests a Dummy Serial port answering from the table."""
+        for streaming in (False, True):
+            ds_instance = dummyserial.Serial(
+                port='/dev/ttyDISK',
+                ds_responses=self.table,
+                ds_streaming=streaming,
+                ds_debug=False
+            )
+            ds_instance.write(b'READ 1234\r')
+            self.assertEqual(b'1234\r', ds_instance.read(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
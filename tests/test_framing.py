@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Framing Codecs."""
+
+import random
+import struct
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.framing
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+class FramingTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Framing Codecs."""
+
+    def test_crc16_modbus(self):
+        """Tests the Modbus CRC against a known frame."""
+        self.assertEqual(
+            0x0A84,
+            dummyserial.framing.crc16_modbus(b'\x01\x03\x00\x00\x00\x01'))
+        self.assertEqual(
+            0x0A84,
+            dummyserial.framing.crc16_modbus(
+                b'\x00\x01',
+                dummyserial.framing.crc16_modbus(b'\x01\x03\x00\x00')))
+
+    def test_slip(self):
+        """Tests SLIP escaping round trips through split frames."""
+        codec = dummyserial.framing.SLIPCodec()
+        payload = b'a\xc0b\xdbc\xdb\xdc\xdd'
+        frame = codec.encode(payload)
+        self.assertEqual(b'\xc0a\xdb\xdcb\xdb\xddc\xdb\xdd\xdc\xdd\xc0', frame)
+
+        payloads, state = codec.decode(frame[:5])
+        self.assertEqual([], payloads)
+        payloads, state = codec.decode(frame[5:] + codec.encode(b'x'), state)
+        self.assertEqual([payload, b'x'], payloads)
+        self.assertEqual(b'', state)
+
+    def test_kiss(self):
+        """Tests KISS data frames are decoded and commands ignored."""
+        codec = dummyserial.framing.KISSCodec(port=1)
+        self.assertEqual(b'\xc0\x10a\xdb\xdc\xc0', codec.encode(b'a\xc0'))
+        payloads, state = codec.decode(
+            b'\xc0\x11\x32\xc0\xc0\x00ignored\xc0\xc0\x10data\xc0\xc0\x10pa')
+        self.assertEqual([b'data'], payloads)
+        self.assertEqual(b'\x10pa', state)
+
+    def test_modbus_rtu(self):
+        """Tests Modbus RTU frames are split by CRC and resynchronized."""
+        codec = dummyserial.framing.ModbusRTUCodec()
+        request = b'\x01\x03\x00\x00\x00\x01'
+        frame = codec.encode(request)
+        self.assertEqual(request + b'\x84\x0a', frame)
+
+        payloads, state = codec.decode(frame[:3])
+        self.assertEqual(([], frame[:3]), (payloads, state[0]))
+        payloads, state = codec.decode(frame[3:] + frame, state)
+        self.assertEqual(([request, request], b''), (payloads, state))
+
+        payloads, state = codec.decode(b'\xff\x00\xff' + frame)
+        self.assertEqual(([request], b''), (payloads, state))
+        payloads, state = codec.decode(b'\x01\x03\x00' + frame)
+        self.assertEqual(([request], b''), (payloads, state))
+        noise = b'\xff' * 300
+        payloads, state = codec.decode(noise)
+        self.assertEqual(([], noise[-255:]), (payloads, state[0]))
+
+    def test_modbus_rtu_stream(self):
+        """Tests Modbus RTU frames with long payloads fed a byte at a time."""
+        codec = dummyserial.framing.ModbusRTUCodec()
+        rand = random.Random(22)
+        requests = []
+        for number in range(200):
+            count = rand.randint(1, 123)
+            requests.append(
+                struct.pack('>BBHHB', rand.randint(1, 247), 0x10,
+                            rand.getrandbits(16), count, count * 2) +
+                bytes(rand.getrandbits(8) for _ in range(count * 2)))
+            if number % 10 == 0:
+                # Unknown function codes are split by CRC search.
+                requests.append(
+                    b'\x01\x41' +
+                    bytes(rand.getrandbits(8) for _ in range(16)))
+        stream = b''.join(codec.encode(request) for request in requests)
+
+        payloads = []
+        state = b''
+        for index in range(len(stream)):
+            decoded, state = codec.decode(stream[index:index + 1], state)
+            payloads.extend(decoded)
+        self.assertEqual(requests, payloads)
+        self.assertEqual(b'', state)
+
+    def test_serial_framing(self):
+        """Tests ports answer framed requests with framed responses."""
+        codec = dummyserial.framing.ModbusRTUCodec()
+        ds_instance = dummyserial.Serial(
+            port='/dev/ttyMODBUS',
+            ds_framing=codec,
+            ds_responses={
+                b'\x01\x03\x00\x00\x00\x01'.decode('latin1'):
+                    b'\x01\x03\x02\x12\x34'},
+            ds_clock=dummyserial.VirtualClock(),
+            ds_debug=False
+        )
+        frame = codec.encode(b'\x01\x03\x00\x00\x00\x01')
+        ds_instance.write(frame[:4])
+        self.assertEqual(0, ds_instance.in_waiting)
+        ds_instance.write(frame[4:] + frame)
+        response = codec.encode(b'\x01\x03\x02\x12\x34')
+        self.assertEqual(response * 2, ds_instance.read(len(response) * 2))
+
+        ds_instance.write(codec.encode(b'\x02\x03\x00\x00\x00\x01'))
+        self.assertEqual(0, ds_instance.in_waiting)
+        self.assertEqual(2, ds_instance.stats.unmatched_writes)
+
+        ds_instance.write(frame[:4])
+        ds_instance.reset_output_buffer()
+        ds_instance.write(frame)
+        self.assertEqual(response, ds_instance.read(len(response)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Pseudo-Terminal Server."""
+
+import os
+import select
+import shutil
+import tempfile
+import threading
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.ptyserver
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+def read_exactly(fd, size, timeout=5):
+    """Reads size bytes from the terminal fd."""
+    data = b''
+    while len(data) < size:
+        if not select.select([fd], [], [], timeout)[0]:
+            break
+        data += os.read(fd, size - len(data))
+    return data
+
+
+@unittest.skipUnless(hasattr(os, 'openpty'), 'requires pseudo-terminals')
+class PTYServerTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Pseudo-Terminal Server."""
+
+    def setUp(self):  # pylint: disable=C0103
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.server = dummyserial.ptyserver.PTYServer()
+        self.addCleanup(self.server.close)
+
+    def open_device(self, name, **kwargs):
+        """Serves a device and opens its terminal."""
+        port = os.path.join(self.directory, name)
+        self.server.add_device(port, **kwargs)
+        fd = os.open(port, os.O_RDWR | os.O_NOCTTY)
+        self.addCleanup(os.close, fd)
+        return fd
+
+    def test_many_devices(self):
+        """Tests answering writes on many terminals."""
+        fds = [
+            self.open_device(
+                'tty{0}'.format(number),
+                ds_responses={'ping': 'pong {0:03d}'.format(number)})
+            for number in range(100)
+        ]
+        for fd in fds:
+            os.write(fd, b'ping')
+
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.01,))
+        thread.start()
+        try:
+            for number, fd in enumerate(fds):
+                self.assertEqual(
+                    'pong {0:03d}'.format(number).encode(),
+                    read_exactly(fd, 8))
+        finally:
+            self.server.stop()
+            thread.join()
+
+    def test_paced_device(self):
+        """Tests paced responses are delivered in full."""
+        fd = self.open_device(
+            'ttyPACED', baudrate=115200, ds_pacing=True, ds_streaming=True,
+            ds_responses={'dump': 'x' * 4096})
+        os.write(fd, b'du')
+        os.write(fd, b'mp')
+
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.01,))
+        thread.start()
+        try:
+            self.assertEqual(b'x' * 4096, read_exactly(fd, 4096))
+        finally:
+            self.server.stop()
+            thread.join()
+
+    def test_paced_timers(self):
+        """Tests a device held back by pacing has one pending timer."""
+        fd = self.open_device(
+            'ttyTIMERS', baudrate=300, ds_pacing=True, ds_streaming=True,
+            ds_responses={'a': 'x' * 100})
+        for _ in range(10):
+            os.write(fd, b'a')
+            self.server.run_once(0.1)
+        self.assertEqual(1, len(self.server._timers))  # pylint: disable=W0212
+
+    def test_add_device_error(self):
+        """Tests failing to link a terminal does not leak its descriptors."""
+        port = os.path.join(self.directory, 'ttyFILE')
+        with open(port, 'w'):
+            pass
+        before = len(os.listdir('/dev/fd'))
+        with self.assertRaises(OSError):
+            self.server.add_device(port)
+        self.assertEqual(before, len(os.listdir('/dev/fd')))
+        self.assertEqual({}, self.server.devices)
+
+    def test_remove_device(self):
+        """Tests removing a device removes its symlink."""
+        port = os.path.join(self.directory, 'ttyGONE')
+        device = self.server.add_device(port)
+        self.assertTrue(os.path.islink(port))
+        self.assertEqual(os.readlink(port), device.tty_name)
+        with self.assertRaises(dummyserial.DSIOError):
+            self.server.add_device(port)
+        self.server.remove_device(port)
+        self.assertFalse(os.path.lexists(port))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial Stateful Sessions."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from .context import dummyserial
+
+import dummyserial.session
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+SCRIPT = {
+    'initial': 'login',
+    'states': {
+        'login': [
+            {'request': 'admin\r', 'response': '> ', 'next': 'menu'},
+            {'unmatched': True, 'response': 'login: '},
+        ],
+        'menu': [
+            {'request': 'read\r', 'response': ['1\r', '2\r', '3\r']},
+            {'request': 'quit\r', 'response': 'bye\r', 'next': 'login'},
+        ],
+    },
+}
+
+
+class SessionTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial Stateful Sessions."""
+
+    def test_serial_session(self):
+        """Tests a Dummy Serial port answering from a session."""
+        session = dummyserial.session.Session(SCRIPT)
+        ds_instance = dummyserial.Serial(
+            port='/dev/ttySESSION',
+            ds_session=session,
+            ds_debug=False
+        )
+
+        ds_instance.write(b'read\r')
+        self.assertEqual(b'login: ', ds_instance.read_all())
+        ds_instance.write(b'admin\r')
+        self.assertEqual('menu', session.state)
+        for _ in range(2):
+            ds_instance.write(b'read\r')
+            ds_instance.write(b'read\r')
+            ds_instance.write(b'read\r')
+        self.assertEqual(b'> 1\r2\r3\r1\r2\r3\r', ds_instance.read_all())
+
+        ds_instance.write(b'nope\r')
+        self.assertEqual(0, ds_instance.in_waiting)
+        self.assertEqual(1, ds_instance.stats.unmatched_writes)
+
+        ds_instance.write(b'quit\r')
+        self.assertEqual('login', session.state)
+        self.assertEqual(b'bye\r', ds_instance.read_all())
+
+    def test_shared_script(self):
+        """Tests sessions sharing a compiled script keep their own state."""
+        script = dummyserial.session.SessionScript(SCRIPT)
+        session_1 = dummyserial.session.Session(script)
+        session_2 = dummyserial.session.Session(script, state='menu')
+        self.assertEqual([b'> '], session_1.respond(b'admin\r'))
+        self.assertEqual([b'1\r'], session_1.respond(b'read\r'))
+        self.assertEqual([b'1\r'], session_2.respond(b'read\r'))
+        session_1.reset()
+        self.assertEqual('login', session_1.state)
+
+    def test_load(self):
+        """Tests compiling a script from a JSON file."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'session.json')
+        with open(path, 'w') as script_file:
+            json.dump(SCRIPT, script_file)
+
+        script = dummyserial.session.SessionScript.load(path)
+        self.assertEqual(4, len(script.transitions))
+
+    def test_invalid_script(self):
+        """Tests compiling invalid scripts."""
+        with self.assertRaises(dummyserial.DSTypeError):
+            dummyserial.session.SessionScript({'states': {}})
+        with self.assertRaises(dummyserial.DSTypeError):
+            dummyserial.session.SessionScript(
+                {'states': {'a': [{'request': 'x', 'next': 'b'}]}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Dummy Serial TCP Server."""
+
+import os
+import selectors
+import socket
+import threading
+import unittest
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import serial
+
+from .context import dummyserial
+
+import dummyserial.tcpserver
+
+__author__ = 'Greg Albrecht <gba@orionlabs.io>'
+__license__ = 'Apache License, Version 2.0'
+__copyright__ = 'Copyright 2016 Orion Labs, Inc.'
+
+
+def max_clients(clients):
+    """
+    Returns how many of clients fit the descriptor limit, with a client
+    and a server socket each in this process.
+    """
+    if resource is None:
+        return clients
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return clients
+    return max(1, min(clients, (soft - 64) // 2))
+
+
+class TCPServerTest(unittest.TestCase):  # pylint: disable=R0904
+    """Tests for Dummy Serial TCP Server."""
+
+    def setUp(self):  # pylint: disable=C0103
+        self.server = dummyserial.tcpserver.TCPServer()
+        self.addCleanup(self.server.close)
+
+    def serve(self):
+        """Runs the server in a thread until the test ends."""
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  args=(0.01,))
+        thread.start()
+
+        def stop():
+            self.server.stop()
+            thread.join()
+        self.addCleanup(stop)
+
+    def test_load(self):
+        """Tests answering many concurrent clients on localhost."""
+        device = self.server.add_device(
+            ds_responses={'ping\n': 'pong\n'}, ds_streaming=True)
+        self.serve()
+
+        clients = max_clients(1000)
+        rounds = 5
+        selector = selectors.DefaultSelector()
+        self.addCleanup(selector.close)
+        received = {}
+        for number in range(clients):
+            sock = socket.create_connection(device.address)
+            self.addCleanup(sock.close)
+            sock.sendall(b'ping\n' * rounds)
+            sock.setblocking(False)
+            selector.register(sock, selectors.EVENT_READ)
+            received[sock] = b''
+
+        expected = b'pong\n' * rounds
+        remaining = clients
+        while remaining:
+            events = selector.select(10)
+            self.assertTrue(events, 'timed out answering clients')
+            for key, _ in events:
+                sock = key.fileobj
+                received[sock] += sock.recv(4096)
+                if len(received[sock]) == len(expected):
+                    selector.unregister(sock)
+                    remaining -= 1
+        self.assertEqual([expected] * clients, list(received.values()))
+
+    @unittest.skipIf(resource is None, 'requires resource limits')
+    def test_descriptor_limit(self):
+        """Tests accepting pauses while descriptors run out."""
+        device = self.server.add_device(ds_responses={'ping\n': 'pong\n'})
+        first = socket.create_connection(device.address)
+        self.addCleanup(first.close)
+        self.server.run_once(1)
+        self.assertEqual(1, len(device.connections))
+
+        second = socket.create_connection(device.address)
+        self.addCleanup(second.close)
+        second.settimeout(5)
+        limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+        self.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE, limits)
+        probe = os.dup(0)
+        os.close(probe)
+        with self.assertLogs('dummyserial.tcpserver', 'WARNING'):
+            resource.setrlimit(resource.RLIMIT_NOFILE, (probe, limits[1]))
+            self.server.run_once(1)
+            resource.setrlimit(resource.RLIMIT_NOFILE, limits)
+        self.assertEqual(1, len(device.connections))
+
+        # Closing a connection frees a descriptor and resumes accepting.
+        first.close()
+        self.server.run_once(1)
+        self.server.run_once(1)
+        self.assertEqual(1, len(device.connections))
+        second.sendall(b'ping\n')
+        self.server.run_once(1)
+        self.assertEqual(b'pong\n', second.recv(5))
+
+    def test_socket_url(self):
+        """Tests pySerial socket:// clients, with a lazy response."""
+        device = self.server.add_device(
+            ds_responses={'dump': (b'x' * 1024 for _ in range(1024))})
+        self.serve()
+
+        client = serial.serial_for_url(
+            'socket://{0}:{1}'.format(*device.address), timeout=5)
+        self.addCleanup(client.close)
+        client.write(b'dump')
+        self.assertEqual(b'x' * 1024 * 1024, client.read(1024 * 1024))
+
+    def test_rfc2217_url(self):
+        """Tests pySerial rfc2217:// clients negotiate settings and data."""
+        device = self.server.add_device(
+            protocol='rfc2217',
+            ds_responses={'ATI\r': b'\xff\xfe DUMMY\r'})
+        self.serve()
+
+        client = serial.serial_for_url(
+            'rfc2217://{0}:{1}'.format(*device.address),
+            baudrate=115200, timeout=5)
+        self.addCleanup(client.close)
+        client.write(b'ATI\r')
+        self.assertEqual(b'\xff\xfe DUMMY\r', client.read(9))
+        client.baudrate = 19200
+        self.assertTrue(client.cts)
+
+        connection, = list(device.connections)
+        self.assertEqual(19200, connection.serial.baudrate)
+
+    def test_virtual_latency(self):
+        """Tests latency on a virtual clock is answered without waiting."""
+        clock = dummyserial.VirtualClock()
+        device = self.server.add_device(
+            ds_responses={'ping\n': 'pong\n'}, ds_latency=30, ds_clock=clock)
+        self.serve()
+
+        sock = socket.create_connection(device.address)
+        self.addCleanup(sock.close)
+        sock.settimeout(5)
+        sock.sendall(b'ping\n')
+        self.assertEqual(b'pong\n', sock.recv(5))
+        self.assertEqual(30, clock.elapsed)
+
+    def test_remove_device(self):
+        """Tests removing a device closes its connections."""
+        device = self.server.add_device()
+        with self.assertRaises(dummyserial.DSIOError):
+            self.server.add_device(protocol='telnet')
+        sock = socket.create_connection(device.address)
+        self.addCleanup(sock.close)
+        self.server.run_once(1)
+        self.assertEqual(1, len(device.connections))
+        self.server.remove_device(device.address)
+        self.assertEqual(b'', sock.recv(1))
+        self.assertEqual({}, self.server.devices)
+
+
+if __name__ == '__main__':
+    unittest.main()